@@ -1,45 +1,101 @@
 from flask import Flask
-from routes.home_route import home_routes
-from routes.chat_routes import chat_routes
-from routes.telegram_routes import telegram_routes
-from scheduler.telegram_quote_scheduler import start_scheduler
-from routes.affiliate_routes import affiliate_routes
-from routes.amazon_routes import amazon_bp
-from utils.logger import setup_logging
-from routes.send_amazon_product_to_telegram_routes import send_amazon_product_to_telegram_bp
-from services.playwright_amazon_service import BrowserManager
-from routes.ui_routes import ui_ai_routes
+from importlib import import_module
+from config import APP_BLUEPRINTS, DIGEST_ENABLED
+from utils.logger import init_request_logging, setup_logging
+from utils.http_cache import init_compression
 
 from flask_cors import CORS
 import logging
 import os
 
-app = Flask(__name__)
-CORS(app)
+# name -> (route module, blueprint attribute, url prefix).
+# Route modules import their services inside the view functions, so a
+# deployment started with APP_BLUEPRINTS=chat,home never imports
+# Playwright, BeautifulSoup or the scrapers.
+BLUEPRINTS = {
+    "home": ("routes.home_route", "home_routes", None),
+    "ui": ("routes.ui_routes", "ui_ai_routes", None),
+    "chat": ("routes.chat_routes", "chat_routes", None),
+    "telegram": ("routes.telegram_routes", "telegram_routes", None),
+    "affiliate": ("routes.affiliate_routes", "affiliate_routes", None),
+    "amazon": ("routes.amazon_routes", "amazon_bp", "/amazon"),
+    "send_product": ("routes.send_amazon_product_to_telegram_routes", "send_amazon_product_to_telegram_bp", None),
+    "digest": ("routes.deal_digest_routes", "deal_digest_routes", None),
+}
+# Never registered before blueprints became selectable, so "all" leaves it
+# out; name it explicitly (APP_BLUEPRINTS=all,home) to serve GET /.
+OPT_IN_BLUEPRINTS = {"home"}
 
 initialized = False  # one-time init flag
 
-@app.before_request
 def initialize_playwright():
     global initialized
     if not initialized:
         try:
+            from services.playwright_amazon_service import BrowserManager
             logging.info("Starting Playwright browser...")
             BrowserManager.start(headless=True)
+            BrowserManager.warm_pools()
             logging.info("Playwright started successfully.")
         except Exception as e:
-            logging.error(f"Playwright startup failed: {e}")
+            logging.error("Playwright startup failed: %s", e)
         initialized = True
 
 setup_logging()
 
-app.register_blueprint(ui_ai_routes)
-app.register_blueprint(chat_routes)
-app.register_blueprint(telegram_routes)
-app.register_blueprint(affiliate_routes)
-app.register_blueprint(amazon_bp, url_prefix="/amazon")
-app.register_blueprint(send_amazon_product_to_telegram_bp)
+def selected_blueprints(names=None) -> list:
+    names = names or APP_BLUEPRINTS
+    unknown = [name for name in names if name != "all" and name not in BLUEPRINTS]
+    if unknown:
+        raise ValueError(f"Unknown APP_BLUEPRINTS entries: {', '.join(unknown)}")
+    if "all" in names:
+        return [name for name in BLUEPRINTS if name not in OPT_IN_BLUEPRINTS or name in names]
+    return list(names)
+
+def register_blueprints(flask_app, names=None):
+    for name in selected_blueprints(names):
+        module, attr, url_prefix = BLUEPRINTS[name]
+        flask_app.register_blueprint(getattr(import_module(module), attr), url_prefix=url_prefix)
+    logging.info("Registered blueprints: %s", ", ".join(selected_blueprints(names)))
+
+def create_app(names=None, playwright: bool = True):
+    """
+    Build the Flask app for `names` (APP_BLUEPRINTS by default).
+    playwright=False leaves out the hook that starts the sync browser; the
+    ASGI fallback uses it because asgi.py runs its own async browser.
+    """
+    flask_app = Flask(__name__)
+    CORS(flask_app)
+    init_request_logging(flask_app)  # registered first so every hook below logs with the request id
+    init_compression(flask_app)
+    register_blueprints(flask_app, names)
+
+    # Only the Playwright-backed /amazon routes need the browser
+    if playwright and "amazon" in selected_blueprints(names):
+        flask_app.before_request(initialize_playwright)
+    return flask_app
+
+def start_background_jobs(names=None):
+    """The digest job only runs where its routes are served (and DIGEST_ENABLED is set)."""
+    if "digest" in selected_blueprints(names) and DIGEST_ENABLED:
+        from scheduler.deal_digest_scheduler import start_digest_scheduler
+        start_digest_scheduler()
+
+_app = None
+
+def __getattr__(name):
+    # `app` is built on first use (gunicorn app:app), so asgi.py can import
+    # create_app without a second Flask app and digest scheduler
+    global _app
+    if name != "app":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if _app is None:
+        _app = create_app()
+        start_background_jobs()
+    return _app
 
 if __name__ == "__main__":
+    app = create_app()
+    start_background_jobs()
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=False, use_reloader=False, threaded=True)
@@ -0,0 +1,74 @@
+"""
+ASGI entry point: async serving mode for the I/O-bound routes.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+/chat, /send-quote-from-chat, /amazon/amazon-info and
+/telegram/send-amazon-product are served by async handlers, so each
+in-flight request is a coroutine waiting on OpenRouter / Telegram / Amazon
+rather than a parked worker thread. Every other route is served by the
+Flask app (app.py) through the WSGI fallback below, on a pool of
+WSGI_FALLBACK_THREADS threads.
+"""
+from quart import Quart
+from quart_cors import cors
+from a2wsgi import WSGIMiddleware
+
+from app import create_app, start_background_jobs
+from config import WSGI_FALLBACK_THREADS
+from routes.async_routes import async_routes
+from services.async_http import close_async_client
+from services.playwright_amazon_service import BrowserManager
+from utils.logger import init_async_request_logging, setup_logging
+from utils.http_cache import init_async_compression
+import asyncio
+import logging
+
+setup_logging()
+
+quart_app = cors(Quart(__name__))
+init_async_request_logging(quart_app)
+init_async_compression(quart_app)
+quart_app.register_blueprint(async_routes)
+
+_warmup_task = None
+
+async def _warm_pools():
+    try:
+        await BrowserManager.awarm_pools()
+    except Exception as e:
+        logging.error("Async Playwright pool warm-up failed: %s", e)
+
+@quart_app.before_serving
+async def start_jobs():
+    start_background_jobs()
+
+@quart_app.before_serving
+async def start_browser():
+    global _warmup_task
+    try:
+        await BrowserManager.astart(headless=True)
+    except Exception as e:
+        logging.error("Async Playwright startup failed: %s", e)
+        return
+    # Home-page warm-ups run while serving; scrapes arriving first open their own context
+    _warmup_task = asyncio.create_task(_warm_pools())
+
+@quart_app.after_serving
+async def shutdown():
+    if _warmup_task and not _warmup_task.done():
+        _warmup_task.cancel()
+    await BrowserManager.astop()
+    await close_async_client()
+
+_async_paths = {rule.rule for rule in quart_app.url_map.iter_rules() if rule.endpoint != "static"}
+# Without the Playwright hook: the async browser above serves /amazon.
+# Not asgiref's WsgiToAsgi: it runs every request on one shared thread.
+_wsgi_fallback = WSGIMiddleware(create_app(playwright=False), workers=WSGI_FALLBACK_THREADS)
+
+async def app(scope, receive, send):
+    """Dispatch the async routes to Quart, everything else to the Flask app."""
+    if scope["type"] == "http" and scope["path"] not in _async_paths:
+        await _wsgi_fallback(scope, receive, send)
+        return
+    await quart_app(scope, receive, send)
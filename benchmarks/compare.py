@@ -0,0 +1,65 @@
+# benchmarks/compare.py
+"""
+Compare two result files written by benchmarks/run.py.
+
+Usage:
+    python -m benchmarks.compare before.json after.json [--metric p50_ms] [--fail-above 10]
+
+Exits with status 1 when any shared scenario regressed by more than
+--fail-above percent on the chosen metric.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)["results"]
+
+
+def compare(base: dict, head: dict, metric: str) -> list:
+    rows = []
+    for name in sorted(set(base) | set(head)):
+        old = base.get(name, {}).get(metric)
+        new = head.get(name, {}).get(metric)
+        change = None
+        if old and new is not None:
+            change = (new - old) / old * 100
+        rows.append((name, old, new, change))
+    return rows
+
+
+def _fmt(value) -> str:
+    return f"{value:12.2f}" if isinstance(value, (int, float)) else f"{'-':>12s}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Diff two benchmark result files")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--metric", default="p50_ms")
+    parser.add_argument("--fail-above", type=float, default=None, help="regression threshold in percent")
+    args = parser.parse_args(argv)
+
+    rows = compare(load(args.base), load(args.head), args.metric)
+    higher_is_better = args.metric == "throughput_rps"
+    regressions = []
+
+    print(f"{'scenario':45s} {'base':>12s} {'head':>12s} {'change':>9s}")
+    for name, old, new, change in rows:
+        pct = f"{change:+8.1f}%" if change is not None else f"{'-':>9s}"
+        print(f"{name:45s} {_fmt(old)} {_fmt(new)} {pct}")
+        if change is not None and args.fail_above is not None:
+            worse = -change if higher_is_better else change
+            if worse > args.fail_above:
+                regressions.append(name)
+
+    if regressions:
+        print(f"Regressions above {args.fail_above}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
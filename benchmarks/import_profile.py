@@ -0,0 +1,122 @@
+# benchmarks/import_profile.py
+"""
+Import-time profile of app.py per blueprint selection.
+
+Each variant imports the app in a fresh interpreter under `python -X importtime`
+with APP_BLUEPRINTS set, and reports the wall time of `import app`, max RSS,
+module count, which heavy dependencies got loaded and the packages that
+cost the most (cumulative self time per top-level package).
+
+Usage:
+    python -m benchmarks.import_profile
+    python -m benchmarks.import_profile --variants all,chat+home,affiliate --repeat 5
+    python -m benchmarks.import_profile --output import_profile.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["playwright", "bs4", "apscheduler", "httpx", "PIL", "quart",
+                 "services.amazon_service", "services.playwright_amazon_service", "services.chat_service"]
+
+_CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+import app
+flask_app = app.app  # built on first access, as under gunicorn app:app
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "import_ms": round(elapsed * 1000, 1),
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modules": len(sys.modules),
+    "heavy": [m for m in %r if m in sys.modules],
+    "routes": sorted(r.rule for r in flask_app.url_map.iter_rules()),
+}))
+""" % (HEAVY_MODULES,)
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Sum `-X importtime` self times (microseconds) per top-level package."""
+    per_package = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, _, name = line[len("import time:"):].split("|", 2)
+            per_package[name.strip().split(".")[0]] += int(self_us)
+        except ValueError:
+            continue
+    return dict(per_package)
+
+
+def profile_variant(blueprints: str) -> dict:
+    env = dict(os.environ, APP_BLUEPRINTS=blueprints, LOG_LEVEL="WARNING", PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _CHILD],
+                          cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=120)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import app failed for APP_BLUEPRINTS={blueprints}:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["packages_us"] = parse_importtime(proc.stderr)
+    return result
+
+
+def profile(variants: list, repeat: int) -> dict:
+    report = {}
+    for variant in variants:
+        blueprints = variant.replace("+", ",")
+        runs = [profile_variant(blueprints) for _ in range(repeat)]
+        packages = defaultdict(list)
+        for run in runs:
+            for name, us in run["packages_us"].items():
+                packages[name].append(us)
+        report[variant] = {
+            "import_ms": round(statistics.median(r["import_ms"] for r in runs), 1),
+            "max_rss_kb": int(statistics.median(r["max_rss_kb"] for r in runs)),
+            "modules": runs[-1]["modules"],
+            "heavy": runs[-1]["heavy"],
+            "routes": runs[-1]["routes"],
+            "top_packages_ms": {
+                name: round(statistics.median(us) / 1000, 1)
+                for name, us in sorted(packages.items(), key=lambda kv: -statistics.median(kv[1]))[:10]
+            },
+        }
+    return report
+
+
+def print_report(report: dict):
+    for variant, r in report.items():
+        print(f"APP_BLUEPRINTS={variant.replace('+', ',')}")
+        print(f"  import app     {r['import_ms']:8.1f} ms")
+        print(f"  max RSS        {r['max_rss_kb'] / 1024:8.1f} MB")
+        print(f"  modules        {r['modules']:8d}")
+        print(f"  heavy loaded   {', '.join(r['heavy']) or '-'}")
+        print("  top packages   " + ", ".join(f"{name} {ms}ms" for name, ms in r["top_packages_ms"].items()))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time profile of app.py per APP_BLUEPRINTS selection")
+    parser.add_argument("--variants", default="all,chat+home,affiliate",
+                        help="comma separated selections; use + inside one selection (chat+home)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per variant (median is reported)")
+    parser.add_argument("--output", help="also write the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    report = profile([v for v in args.variants.split(",") if v.strip()], args.repeat)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"Report written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+# benchmarks/run.py
+"""
+Offline benchmark suite.
+
+Starts the local stand-ins from benchmarks/servers.py, points the app at them
+through the usual environment variables and measures:
+
+* per-stage latency  - expand, fetch, parse, safe_text, full scrape, chat, telegram
+* throughput         - the /telegram/send-amazon-product route under concurrency,
+                       on the Flask app (threads) and asgi.py (coroutines)
+* peak memory        - tracemalloc peak per scenario + process max RSS
+
+Results are written as JSON so two runs can be diffed with benchmarks/compare.py.
+
+Usage:
+    python -m benchmarks.run --iterations 20 --concurrency 1,4,16 --output before.json
+    python -m benchmarks.run --openrouter-latency 800 --telegram-error-rate 0.05
+    python -m benchmarks.run --skip-playwright
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.servers import AmazonFixtureServer, FaultConfig, OpenRouterStandIn, TelegramStandIn
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+PRODUCT_ASINS = ["B07PR1CL3S", "B0756K5DYZ", "B08D9TXH5B"]
+
+
+# ---------------- Measurement helpers ---------------- #
+def _summarize(samples_ms: list, errors: int = 0) -> dict:
+    if not samples_ms:
+        return {"n": 0, "errors": errors}
+    ordered = sorted(samples_ms)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+    return {
+        "n": len(ordered),
+        "errors": errors,
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(pct(50), 3),
+        "p90_ms": round(pct(90), 3),
+        "p99_ms": round(pct(99), 3),
+        "min_ms": round(ordered[0], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def _is_error(result) -> bool:
+    if isinstance(result, dict):
+        return "error" in result or result.get("success") is False
+    if isinstance(result, tuple) and len(result) == 2:
+        return result[1] != 200
+    return False
+
+
+def measure(fn, iterations: int, inputs: list, warmup: int = 1) -> dict:
+    """Call fn(input) round-robin over inputs and return latency stats + peak memory."""
+    for i in range(warmup):
+        fn(inputs[i % len(inputs)])
+
+    samples, errors = [], 0
+    tracemalloc.start()
+    try:
+        for i in range(iterations):
+            start = time.perf_counter()
+            result = fn(inputs[i % len(inputs)])
+            samples.append((time.perf_counter() - start) * 1000)
+            if _is_error(result):
+                errors += 1
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    summary = _summarize(samples, errors)
+    summary["peak_alloc_kb"] = round(peak / 1024, 1)
+    return summary
+
+
+def measure_concurrent(fn, requests_total: int, concurrency: int, inputs: list) -> dict:
+    """Fire requests_total calls from a pool of `concurrency` threads."""
+
+    def _one(i):
+        start = time.perf_counter()
+        result = fn(inputs[i % len(inputs)])
+        return (time.perf_counter() - start) * 1000, _is_error(result)
+
+    tracemalloc.start()
+    wall_start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(_one, range(requests_total)))
+        wall = time.perf_counter() - wall_start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    summary = _summarize([ms for ms, _ in outcomes], sum(1 for _, err in outcomes if err))
+    summary["concurrency"] = concurrency
+    summary["wall_s"] = round(wall, 3)
+    summary["throughput_rps"] = round(len(outcomes) / wall, 2) if wall else None
+    summary["peak_alloc_kb"] = round(peak / 1024, 1)
+    return summary
+
+
+def _max_rss_kb() -> int:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return usage // 1024 if sys.platform == "darwin" else usage
+
+
+def _git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+# ---------------- Scenarios ---------------- #
+def bench_static(amazon, iterations: int) -> dict:
+    import requests
+    from bs4 import BeautifulSoup
+    from services import amazon_service
+
+    urls = [amazon.product_url(a) for a in PRODUCT_ASINS]
+    shorts = [amazon.short_url(a) for a in PRODUCT_ASINS]
+    pages = [requests.get(u, timeout=10).text for u in urls]
+    soups = [BeautifulSoup(p, "html.parser") for p in pages]
+    price_sel = [".a-price .a-offscreen", "#priceblock_ourprice", "#priceblock_dealprice"]
+
+    return {
+        "static.expand_amazon_url": measure(amazon_service.expand_amazon_url, iterations, shorts),
+        "static.fetch": measure(lambda u: requests.get(u, timeout=10), iterations, urls),
+        "static.parse": measure(lambda html: BeautifulSoup(html, "html.parser"), iterations, pages),
+        "static.safe_text": measure(lambda s: amazon_service.safe_text(s, price_sel), iterations * 10, soups),
+        "static.scrape_amazon_details": measure(
+            lambda u: amazon_service.scrape_amazon_details(u, u), iterations, urls),
+    }
+
+
+def bench_playwright(amazon, iterations: int) -> dict:
+    from services import playwright_amazon_service as pw
+
+    try:
+        pw.BrowserManager.start(headless=True)
+    except Exception as e:
+        logging.warning("Playwright unavailable, skipping browser scenarios: %s", e)
+        return {"playwright": {"skipped": str(e).splitlines()[0]}}
+
+    urls = [amazon.product_url(a) for a in PRODUCT_ASINS]
+    shorts = [amazon.short_url(a) for a in PRODUCT_ASINS]
+    try:
+        return {
+            "playwright.new_context": measure(lambda _: pw.BrowserManager.new_context().close(), iterations, [None]),
+            "playwright.expand_amazon_url": measure(pw.expand_amazon_url, iterations, shorts),
+            "playwright.scrape_amazon_details": measure(
+                lambda u: pw.scrape_amazon_details(u, u), iterations, urls),
+        }
+    finally:
+        pw.BrowserManager.stop()
+
+
+def bench_upstreams(amazon, iterations: int) -> dict:
+    from services.chat_service import handle_chat_request
+    from services.send_amazon_product_to_telegram_service import send_amazon_product_to_telegram
+    from services.telegram_service import send_telegram_message
+
+    product = {"orgUrl": amazon.short_url(PRODUCT_ASINS[0]), "title": "Bench product"}
+    return {
+        "chat.handle_chat_request": measure(handle_chat_request, iterations, ["Give me an inspiring quote"]),
+        "telegram.send_telegram_message": measure(send_telegram_message, iterations, ["bench"]),
+        "telegram.send_amazon_product": measure(
+            lambda s: send_amazon_product_to_telegram(product, s), iterations, ["🔥 Deal alert"]),
+    }
+
+
+def bench_routes(amazon, iterations: int, concurrency_levels: list) -> dict:
+    from app import app
+
+    client = app.test_client()
+    shorts = [amazon.short_url(a) for a in PRODUCT_ASINS]
+
+    def _send_product(url):
+        res = client.get("/telegram/send-amazon-product", query_string={"url": url})
+        return {"error": res.status_code} if res.status_code != 200 else {}
+
+    def _chat(message):
+        res = client.post("/chat", json={"message": message})
+        return {"error": res.status_code} if res.status_code != 200 else {}
+
+    results = {
+        "route.chat": measure(_chat, iterations, ["hello"]),
+        "route.send_amazon_product": measure(_send_product, iterations, shorts),
+    }
+    for c in concurrency_levels:
+        results[f"throughput.send_amazon_product.c{c}"] = measure_concurrent(
+            _send_product, max(iterations, c * 4), c, shorts)
+    return results
+
+
+def bench_asgi(amazon, iterations: int, concurrency_levels: list) -> dict:
+    """Same route as bench_routes, served by asgi.py with concurrent coroutines instead of threads."""
+    import asyncio
+    import httpx
+    import asgi
+    from services.async_http import close_async_client
+
+    shorts = [amazon.short_url(a) for a in PRODUCT_ASINS]
+
+    async def _run(concurrency: int, total: int) -> dict:
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def _one(i):
+                async with semaphore:
+                    start = time.perf_counter()
+                    res = await client.get("/telegram/send-amazon-product", params={"url": shorts[i % len(shorts)]})
+                    return (time.perf_counter() - start) * 1000, res.status_code != 200
+
+            wall_start = time.perf_counter()
+            outcomes = await asyncio.gather(*[_one(i) for i in range(total)])
+            wall = time.perf_counter() - wall_start
+        await close_async_client()
+
+        summary = _summarize([ms for ms, _ in outcomes], sum(1 for _, err in outcomes if err))
+        summary["concurrency"] = concurrency
+        summary["wall_s"] = round(wall, 3)
+        summary["throughput_rps"] = round(len(outcomes) / wall, 2) if wall else None
+        return summary
+
+    return {
+        f"throughput.asgi.send_amazon_product.c{c}": asyncio.run(_run(c, max(iterations, c * 4)))
+        for c in concurrency_levels
+    }
+
+
+# ---------------- Entry point ---------------- #
+def _configure_env(openrouter, telegram):
+    # Must happen before config.py is imported by any service module
+    os.environ["OPENROUTER_API_URL"] = openrouter.api_url
+    os.environ["OPENROUTER_API_KEY"] = "bench-key"
+    os.environ["TELEGRAM_API_URL"] = telegram.base_url
+    os.environ["TELEGRAM_BOT_TOKEN"] = "bench-token"
+    os.environ["TELEGRAM_CHAT_ID"] = "-100"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Cold image cache per run so the first post per product pays for the upload
+    os.environ.setdefault("IMAGE_CACHE_DIR", tempfile.mkdtemp(prefix="bench-images-"))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the Amazon -> Telegram pipeline")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", default="1,4,16", help="comma separated thread counts")
+    parser.add_argument("--page-size-kb", type=int, default=800, help="pad fixture pages to this size")
+    parser.add_argument("--amazon-latency", type=float, default=50)
+    parser.add_argument("--amazon-error-rate", type=float, default=0.0)
+    parser.add_argument("--openrouter-latency", type=float, default=300)
+    parser.add_argument("--openrouter-error-rate", type=float, default=0.0)
+    parser.add_argument("--telegram-latency", type=float, default=80)
+    parser.add_argument("--telegram-error-rate", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.1, help="jitter as a fraction of latency")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--skip-playwright", action="store_true")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<timestamp>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    def fault(latency, error_rate):
+        return FaultConfig(latency, latency * args.jitter, error_rate, seed=args.seed)
+
+    amazon = AmazonFixtureServer(fault(args.amazon_latency, args.amazon_error_rate), page_size_kb=args.page_size_kb)
+    openrouter = OpenRouterStandIn(fault(args.openrouter_latency, args.openrouter_error_rate))
+    telegram = TelegramStandIn(fault(args.telegram_latency, args.telegram_error_rate))
+    concurrency_levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    with amazon, openrouter, telegram:
+        _configure_env(openrouter, telegram)
+        results = {}
+        results.update(bench_static(amazon, args.iterations))
+        results.update(bench_upstreams(amazon, args.iterations))
+        if not args.skip_playwright:
+            results.update(bench_playwright(amazon, args.iterations))
+        results.update(bench_routes(amazon, args.iterations, concurrency_levels))
+        results.update(bench_asgi(amazon, args.iterations, concurrency_levels))
+        server_stats = {s.name: s.stats for s in (amazon, openrouter, telegram)}
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+            "faults": {s.name: s.fault.as_dict() for s in (amazon, openrouter, telegram)},
+            "server_stats": server_stats,
+            "max_rss_kb": _max_rss_kb(),
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, ensure_ascii=False)
+
+    for name, stats in results.items():
+        if "p50_ms" in stats:
+            extra = f" {stats['throughput_rps']} req/s" if "throughput_rps" in stats else ""
+            print(f"{name:45s} p50={stats['p50_ms']:>9.2f}ms p90={stats['p90_ms']:>9.2f}ms "
+                  f"err={stats['errors']}{extra}")
+        else:
+            print(f"{name:45s} {stats}")
+    print(f"Results written to {output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
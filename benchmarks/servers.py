@@ -0,0 +1,338 @@
+# benchmarks/servers.py
+"""
+Local stand-ins for everything the app talks to over the network:
+
+* AmazonFixtureServer - serves the recorded product pages in fixtures/amazon,
+  plus amzn.to style short links that redirect to them and the product
+  images (m.media-amazon.com links are rewritten to this server).
+* OpenRouterStandIn   - answers /api/v1/chat/completions like OpenRouter.
+* TelegramStandIn     - answers /bot<token>/<method> like the Bot API.
+
+Every server takes a FaultConfig so latency and error rates can be tuned
+per run without touching the code under test.
+"""
+import io
+import json
+import logging
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "amazon")
+
+
+class FaultConfig:
+    """
+    Latency and error injection settings for a stand-in server.
+    latency_ms/jitter_ms: every response is delayed by latency +- jitter.
+    error_rate: fraction (0..1) of requests answered with error_status.
+    """
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0.0,
+                 error_status: int = 500, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        ms = max(0.0, self.latency_ms + jitter)
+        if ms:
+            time.sleep(ms / 1000.0)
+
+    def should_fail(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def as_dict(self) -> dict:
+        return {
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "error_rate": self.error_rate,
+            "error_status": self.error_status,
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logging.debug("%s - %s", self.server.name, format % args)
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json", headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: dict):
+        self._send(status, json.dumps(payload).encode("utf-8"))
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _count(self, stat: str, by: int = 1) -> int:
+        """Bump a server counter; handler threads run concurrently, so under the server's lock."""
+        with self.server.stats_lock:
+            self.server.stats[stat] = self.server.stats.get(stat, 0) + by
+            return self.server.stats[stat]
+
+    def _handle(self):
+        self._count("requests")
+        self.server.fault.delay()
+        if self.server.fault.should_fail():
+            self._count("injected_errors")
+            self._send_injected_error()
+            return
+        self.route()
+
+    def _send_injected_error(self):
+        self._send_json(self.server.fault.error_status, {"error": {"message": "injected failure"}})
+
+    def route(self):
+        """Subclasses answer their API here; the base server knows no paths."""
+        self._send_json(404, {"error": {"message": f"Not Found: {self.path}"}})
+
+    do_GET = do_POST = do_HEAD = _handle
+
+
+class _StandInServer:
+    """Runs a handler class on 127.0.0.1:<ephemeral port> in a daemon thread."""
+
+    handler_class = _Handler
+    name = "stand-in"
+
+    def __init__(self, fault: Optional[FaultConfig] = None, port: int = 0):
+        self.fault = fault or FaultConfig()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self.handler_class)
+        self._httpd.daemon_threads = True
+        self._httpd.name = self.name
+        self._httpd.fault = self.fault
+        self._httpd.stats = {"requests": 0, "injected_errors": 0}
+        self._httpd.stats_lock = threading.Lock()
+        self._configure(self._httpd)
+        self._thread = None
+
+    def _configure(self, httpd):
+        pass
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def stats(self) -> dict:
+        with self._httpd.stats_lock:
+            return dict(self._httpd.stats)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name=self.name, daemon=True)
+        self._thread.start()
+        logging.info("%s listening on %s", self.name, self.base_url)
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# ---------------- Amazon ---------------- #
+class _AmazonHandler(_Handler):
+
+    def route(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        parts = [p for p in path.split("/") if p]
+
+        # /r/<short> -> 301 to /dp/<ASIN>, like amzn.to
+        if len(parts) == 2 and parts[0] == "r":
+            asin = self.server.short_links.get(parts[1])
+            if not asin:
+                self._send(404, b"unknown short link", "text/plain")
+                return
+            self._send(301, b"", "text/html", {"Location": f"/dp/{asin}"})
+            return
+
+        # /images/I/<name>.jpg -> generated product photo
+        if len(parts) == 3 and parts[0] == "images":
+            self._send(200, self.server.image, "image/jpeg")
+            return
+
+        # /dp/<ASIN> or /<slug>/dp/<ASIN>
+        if "dp" in parts and parts.index("dp") + 1 < len(parts):
+            asin = parts[parts.index("dp") + 1]
+            page = self.server.pages.get(asin)
+            if page is not None:
+                self._send(200, page, "text/html; charset=utf-8")
+                return
+
+        self._send(404, b"<html><body>Page Not Found</body></html>", "text/html")
+
+    def _send_injected_error(self):
+        self._send(self.server.fault.error_status, b"<html><body>Service Unavailable</body></html>", "text/html")
+
+
+class AmazonFixtureServer(_StandInServer):
+    """
+    Serves the recorded pages listed in fixtures/amazon/manifest.json.
+    page_size_kb pads each page with inline <script> filler so that parse
+    cost matches a real product page (~1 MB) rather than the trimmed fixture.
+    """
+
+    handler_class = _AmazonHandler
+    name = "amazon-fixtures"
+
+    def __init__(self, fault: Optional[FaultConfig] = None, port: int = 0,
+                 page_size_kb: int = 0, fixtures_dir: str = FIXTURES_DIR):
+        self.page_size_kb = page_size_kb
+        self.fixtures_dir = fixtures_dir
+        with open(os.path.join(fixtures_dir, "manifest.json"), encoding="utf-8") as fh:
+            self.manifest = json.load(fh)
+        super().__init__(fault, port)
+
+    def _configure(self, httpd):
+        httpd.pages = {}
+        httpd.short_links = {}
+        httpd.image = _fixture_image()
+        for asin, entry in self.manifest.items():
+            with open(os.path.join(self.fixtures_dir, entry["file"]), encoding="utf-8") as fh:
+                html = fh.read().replace(IMAGE_HOST, self.base_url)
+            httpd.pages[asin] = _pad_html(html, self.page_size_kb).encode("utf-8")
+            if entry.get("short"):
+                httpd.short_links[entry["short"]] = asin
+
+    def product_url(self, asin: str) -> str:
+        return f"{self.base_url}/dp/{asin}"
+
+    def short_url(self, asin: str) -> str:
+        return f"{self.base_url}/r/{self.manifest[asin]['short']}"
+
+
+IMAGE_HOST = "https://m.media-amazon.com"
+
+
+def _fixture_image(side: int = 1500) -> bytes:
+    """A full-size (_SL1500_-like) JPEG; a tiny placeholder when Pillow is missing."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return b"\xff\xd8\xff\xe0" + b"\x00" * 1024 + b"\xff\xd9"
+    linear = Image.linear_gradient("L").resize((side, side))
+    radial = Image.radial_gradient("L").resize((side, side))
+    img = Image.merge("RGB", (linear, radial, linear.transpose(Image.Transpose.ROTATE_90)))
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=90)
+    return out.getvalue()
+
+
+def _pad_html(html: str, page_size_kb: int) -> str:
+    missing = page_size_kb * 1024 - len(html.encode("utf-8"))
+    if missing <= 0:
+        return html
+    line = "var P={\"a\":\"" + "x" * 100 + "\"};\n"
+    filler = "<script>\n" + line * (missing // len(line) + 1) + "</script>\n"
+    return html.replace("</body>", filler + "</body>", 1)
+
+
+# ---------------- OpenRouter ---------------- #
+class _OpenRouterHandler(_Handler):
+
+    def route(self):
+        if self.command != "POST" or not self.path.startswith("/api/v1/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+        try:
+            payload = json.loads(self._read_body() or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "Invalid JSON"}})
+            return
+        prompt = (payload.get("messages") or [{}])[-1].get("content", "")
+        self._send_json(200, {
+            "id": "gen-bench",
+            "model": payload.get("model"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": self.server.reply_for(prompt)},
+            }],
+            "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": 24},
+        })
+
+
+class OpenRouterStandIn(_StandInServer):
+    """Returns a canned completion; set OPENROUTER_API_URL to .api_url."""
+
+    handler_class = _OpenRouterHandler
+    name = "openrouter-stand-in"
+
+    def _configure(self, httpd):
+        httpd.reply_for = lambda prompt: (
+            "🔥 Deal alert! Grab it before it's gone - limited stock at this price. 🛒✨"
+        )
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}/api/v1/chat/completions"
+
+
+# ---------------- Telegram ---------------- #
+class _TelegramHandler(_Handler):
+
+    def route(self):
+        parts = [p for p in self.path.split("?", 1)[0].split("/") if p]
+        if len(parts) != 2 or not parts[0].startswith("bot"):
+            self._send_json(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+            return
+        method = parts[1]
+        self._read_body()
+        with self.server.stats_lock:
+            self.server.message_id += 1
+            message_id = self.server.message_id
+        result = {"message_id": message_id, "date": int(time.time()), "chat": {"id": -100}}
+        if method in ("sendPhoto", "sendMediaGroup"):
+            photo = [{"file_id": f"bench-file-{message_id}", "width": 800, "height": 800}]
+            result["photo"] = photo
+            if method == "sendMediaGroup":
+                result = [result]
+        elif method != "sendMessage":
+            self._send_json(404, {"ok": False, "error_code": 404, "description": f"Unknown method {method}"})
+            return
+        self._send_json(200, {"ok": True, "result": result})
+
+    def _send_injected_error(self):
+        self._send_json(429, {
+            "ok": False,
+            "error_code": 429,
+            "description": "Too Many Requests: retry after 1",
+            "parameters": {"retry_after": 1},
+        })
+
+
+class TelegramStandIn(_StandInServer):
+    """Bot API stand-in; set TELEGRAM_API_URL to .base_url. Errors are 429s."""
+
+    handler_class = _TelegramHandler
+    name = "telegram-stand-in"
+
+    def _configure(self, httpd):
+        httpd.message_id = 0
@@ -1,5 +1,6 @@
 import os
 from dotenv import load_dotenv
+import urls
 
 # Load environment variables from .env
 load_dotenv()
@@ -12,10 +13,12 @@ DEBUG_MODE = os.getenv("DEBUG_MODE", "True").lower() == "true"
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 YOUR_SITE_URL = os.getenv("YOUR_SITE_URL", "")
 YOUR_SITE_NAME = os.getenv("YOUR_SITE_NAME", "")
+OPENROUTER_API_URL = os.getenv("OPENROUTER_API_URL", urls.OPENROUTER_API_URL)
 
 # Telegram settings
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", urls.TELEGRAM_API_URL)
 
 QUOTE_MESSAGE = os.getenv(
     "QUOTE_MESSAGE",
@@ -25,4 +28,81 @@ QUOTE_MESSAGE = os.getenv(
 try:
     SCHEDULER_INTERVAL_MINUTES = int(os.getenv("SCHEDULER_INTERVAL_MINUTES", "1"))
 except ValueError:
-    SCHEDULER_INTERVAL_MINUTES = 1
\ No newline at end of file
+    SCHEDULER_INTERVAL_MINUTES = 1
+
+# Logging settings
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # "json" or "text"
+try:
+    LOG_INFO_SAMPLE_RATE = float(os.getenv("LOG_INFO_SAMPLE_RATE", "1.0"))
+except ValueError:
+    LOG_INFO_SAMPLE_RATE = 1.0
+
+# Send-product pipeline: worker threads for the secondary fields and the photo download
+try:
+    PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "16"))
+except ValueError:
+    PIPELINE_WORKERS = 16
+
+# asgi.py: worker threads for the routes served by the Flask fallback
+try:
+    WSGI_FALLBACK_THREADS = int(os.getenv("WSGI_FALLBACK_THREADS", "32"))
+except ValueError:
+    WSGI_FALLBACK_THREADS = 32
+
+# Adaptive selector ordering: hit statistics persisted here (empty = in-memory only)
+SELECTOR_STATS_PATH = os.getenv("SELECTOR_STATS_PATH", "data/selector_stats.json")
+
+# Playwright context pools: warm contexts kept per marketplace ("in", "com", "co.uk", "de")
+WARM_MARKETPLACES = [m.strip() for m in os.getenv("WARM_MARKETPLACES", "in").split(",") if m.strip()]
+try:
+    CONTEXT_POOL_SIZE = int(os.getenv("CONTEXT_POOL_SIZE", "2"))
+    CONTEXT_MAX_USES = int(os.getenv("CONTEXT_MAX_USES", "50"))
+except ValueError:
+    CONTEXT_POOL_SIZE = 2
+    CONTEXT_MAX_USES = 50
+
+# Persisted browser sessions (storage state) per marketplace
+SESSION_PROFILE_DIR = os.getenv("SESSION_PROFILE_DIR", "data/sessions")
+SESSION_WARMUP = os.getenv("SESSION_WARMUP", "True").lower() == "true"
+try:
+    SESSION_PROFILES_PER_MARKETPLACE = int(os.getenv("SESSION_PROFILES_PER_MARKETPLACE", str(CONTEXT_POOL_SIZE)))
+    SESSION_SAVE_EVERY = int(os.getenv("SESSION_SAVE_EVERY", "10"))
+except ValueError:
+    SESSION_PROFILES_PER_MARKETPLACE = CONTEXT_POOL_SIZE
+    SESSION_SAVE_EVERY = 10
+
+# End-to-end budget for one request; every stage gets only what is left
+try:
+    REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "30"))
+except ValueError:
+    REQUEST_DEADLINE_SECONDS = 30.0
+
+# Product photos for Telegram posts: content-addressed disk cache + resized variants
+SEND_PRODUCT_PHOTO = os.getenv("SEND_PRODUCT_PHOTO", "True").lower() == "true"
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "data/images")
+try:
+    IMAGE_CACHE_MAX_MB = int(os.getenv("IMAGE_CACHE_MAX_MB", "200"))
+    IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "1280"))
+except ValueError:
+    IMAGE_CACHE_MAX_MB = 200
+    IMAGE_MAX_SIDE = 1280
+
+# Blueprints app.py registers: "all", or a comma separated subset of
+# home, ui, chat, telegram, affiliate, amazon, send_product, digest (e.g. "chat,home");
+# "all" leaves out home (GET /), which is opt-in: "all,home"
+APP_BLUEPRINTS = [b.strip() for b in os.getenv("APP_BLUEPRINTS", "all").split(",") if b.strip()]
+
+# Deal digest: buffer products and post one ranked summary per window
+DIGEST_ENABLED = os.getenv("DIGEST_ENABLED", "False").lower() == "true"
+DIGEST_MEDIA_GROUP = os.getenv("DIGEST_MEDIA_GROUP", "False").lower() == "true"
+DIGEST_BUFFER_PATH = os.getenv("DIGEST_BUFFER_PATH", "data/digest_buffer.json")
+try:
+    DIGEST_WINDOW_MINUTES = int(os.getenv("DIGEST_WINDOW_MINUTES", "60"))
+    DIGEST_MAX_ITEMS = int(os.getenv("DIGEST_MAX_ITEMS", "10"))
+    # Products not posted carry over to the next window until they are this old
+    DIGEST_MAX_AGE_HOURS = float(os.getenv("DIGEST_MAX_AGE_HOURS", "24"))
+except ValueError:
+    DIGEST_WINDOW_MINUTES = 60
+    DIGEST_MAX_ITEMS = 10
+    DIGEST_MAX_AGE_HOURS = 24.0
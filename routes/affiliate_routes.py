@@ -1,6 +1,5 @@
 from flask import Blueprint, request, jsonify
 import logging
-from services.affiliate_service import convert_to_affiliate
 
 affiliate_routes = Blueprint("affiliate_routes", __name__)
 
@@ -14,6 +13,7 @@ def convert():
         "affiliate_id": "yourtag-21"
     }
     """
+    from services.affiliate_service import convert_to_affiliate
     try:
         data = request.get_json(force=True)
         url = data.get("url")
@@ -33,5 +33,5 @@ def convert():
         }), 200
 
     except Exception as e:
-        logging.error(f"Error in /convert: {e}")
+        logging.error("Error in /convert: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
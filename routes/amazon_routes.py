@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
 import logging
-#from services.amazon_service import expand_amazon_url, scrape_amazon_details
-from services.playwright_amazon_service import expand_amazon_url, scrape_amazon_details
+from utils.deadline import request_deadline
+from utils.http_cache import json_response, parse_fields, project
 
 
 amazon_bp = Blueprint("amazon", __name__)
@@ -9,26 +9,40 @@ amazon_bp = Blueprint("amazon", __name__)
 @amazon_bp.route("/amazon-info", methods=["GET"])
 def amazon_info():
     """
-    GET /amazon/amazon-info?url=<amazon_url>
+    GET /amazon/amazon-info?url=<amazon_url>[&fields=title,price,image]
+    Successful responses carry an ETag; a matching If-None-Match gets a 304.
     """
+    #from services.amazon_service import expand_amazon_url, scrape_amazon_details
+    from services.playwright_amazon_service import expand_amazon_url, scrape_amazon_details
+
     url = request.args.get("url")
     if not url:
         return jsonify({"error": "Please provide a 'url' parameter"}), 400
 
     try:
+        deadline = request_deadline(request.headers)
+
         # Expand short URL if needed
         orgURL = url
-        if "amzn.to" in url:
-            shortUrl = expand_amazon_url(url)
+        fullUrl = expand_amazon_url(url, deadline) if "amzn.to" in url else url
 
-        # Scrape product details
-        product_data = scrape_amazon_details(shortUrl,orgURL)
+        # Scrape product details (flagged "partial" if the deadline cut extraction short)
+        product_data = scrape_amazon_details(fullUrl, orgURL, deadline)
 
         if "error" in product_data:
             return jsonify(product_data), 502
 
-        return jsonify(product_data), 200
+        return json_response(project(product_data, parse_fields(request.args.get("fields"))))
 
     except Exception as e:
         logging.exception("Unhandled exception in /amazon-info")
         return jsonify({"error": str(e)}), 500
+
+@amazon_bp.route("/selector-stats", methods=["GET"])
+def selector_stats_info():
+    """
+    GET /amazon/selector-stats
+    Per-field selector hit rates, current fallback order and collapsed fields.
+    """
+    from services.selector_stats import selector_stats
+    return jsonify(selector_stats.snapshot()), 200
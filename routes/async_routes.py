@@ -0,0 +1,129 @@
+from quart import Blueprint, request, jsonify
+import logging
+from services.amazon_service import expand_amazon_url_async as expand_static_url_async
+from services.playwright_amazon_service import expand_amazon_url_async, scrape_amazon_details_async
+from services.chat_service import handle_chat_request_async
+from services.telegram_service import send_telegram_message_async
+from services.product_pipeline import run_send_product_pipeline_async
+from utils.deadline import request_deadline
+from utils.http_cache import ajson_response, parse_fields, project
+from urls import ROUTE_CHAT, ERROR_INVALID_JSON, ERROR_NO_MESSAGE
+
+# Async counterparts of the I/O-bound Flask routes, served by asgi.py.
+# Paths and response shapes match the sync blueprints one-to-one.
+async_routes = Blueprint("async_routes", __name__)
+
+@async_routes.route(ROUTE_CHAT, methods=["POST"])
+async def chat():
+    try:
+        data = await request.get_json(force=True, silent=True)
+        if not data:
+            return jsonify({"error": ERROR_INVALID_JSON}), 400
+
+        user_message = data.get("message", "")
+        if not user_message:
+            return jsonify({"error": ERROR_NO_MESSAGE}), 400
+
+        reply, status_code = await handle_chat_request_async(user_message, request_deadline(request.headers))
+        return jsonify({"reply": reply}), status_code
+
+    except Exception as e:
+        logging.error("Unexpected error in /chat endpoint: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@async_routes.route("/send-quote-from-chat", methods=["POST"])
+async def send_quote_from_chat():
+    """
+    Get quote from chat service and send it to Telegram.
+    """
+    try:
+        data = await request.get_json(force=True, silent=True)
+        if not data:
+            return jsonify({"error": ERROR_INVALID_JSON}), 400
+
+        user_message = data.get("message", "")
+        if not user_message:
+            return jsonify({"error": ERROR_NO_MESSAGE}), 400
+
+        deadline = request_deadline(request.headers)
+
+        # Step 1 — Get reply from chat service
+        reply, status_code = await handle_chat_request_async(user_message, deadline)
+
+        if status_code != 200:
+            return jsonify({"error": reply}), status_code
+
+        # Step 2 — Send reply to Telegram
+        telegram_result, telegram_status = await send_telegram_message_async(reply, deadline)
+
+        return jsonify({
+            "reply": reply,
+            "telegram_status": telegram_status,
+            "telegram_result": telegram_result
+        }), 200
+
+    except Exception as e:
+        logging.error("Error in /send-quote-from-chat: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@async_routes.route("/amazon/amazon-info", methods=["GET"])
+async def amazon_info():
+    """
+    GET /amazon/amazon-info?url=<amazon_url>[&fields=title,price,image]
+    """
+    url = request.args.get("url")
+    if not url:
+        return jsonify({"error": "Please provide a 'url' parameter"}), 400
+
+    try:
+        deadline = request_deadline(request.headers)
+
+        # Expand short URL if needed
+        full_url = await expand_amazon_url_async(url, deadline) if "amzn.to" in url else url
+
+        # Scrape product details
+        product_data = await scrape_amazon_details_async(full_url, url, deadline)
+
+        if "error" in product_data:
+            return jsonify(product_data), 502
+
+        return await ajson_response(project(product_data, parse_fields(request.args.get("fields"))))
+
+    except Exception as e:
+        logging.exception("Unhandled exception in /amazon-info")
+        return jsonify({"error": str(e)}), 500
+
+@async_routes.route("/telegram/send-amazon-product", methods=["GET"])
+async def send_amazon_product_to_telegram_route():
+    """
+    Fetch product info from Amazon, generate an AI summary via OpenRouter,
+    and send that data to Telegram.
+    Example:
+        /telegram/send-amazon-product?url=https://amzn.to/4q2qwct
+    """
+    org_url = request.args.get("url")
+    if not org_url:
+        return jsonify({"error": "Missing 'url' parameter"}), 400
+
+    try:
+        deadline = request_deadline(request.headers)
+
+        # Step 1: Expand short URL if needed
+        full_url = await expand_static_url_async(org_url, deadline)
+
+        # Step 2: Scrape -> AI summary -> Telegram, staged
+        result = await run_send_product_pipeline_async(full_url, org_url, deadline)
+        if "error" in result:
+            return jsonify({"error": "Failed to fetch product details", "details": result}), 500
+
+        response = {
+            "product_title": project(result["product"], parse_fields(request.args.get("fields"))),
+            "ai_summary": result["ai_summary"],
+        }
+        if result.get("partial"):
+            response["partial"] = True
+        return jsonify(response)
+
+    except Exception as e:
+        logging.error("❌ Error in /telegram/send-amazon-product: %s", e)
+        return jsonify({"error": str(e)}), 500
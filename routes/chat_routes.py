@@ -1,12 +1,13 @@
 from flask import Blueprint, request, jsonify
-from services.chat_service import handle_chat_request
 import logging
+from utils.deadline import request_deadline
 from urls import ROUTE_CHAT, ERROR_INVALID_JSON, ERROR_NO_MESSAGE
 
 chat_routes = Blueprint("chat_routes", __name__)
 
 @chat_routes.route(ROUTE_CHAT, methods=["POST"])
 def chat():
+    from services.chat_service import handle_chat_request  # lazy: keeps app import cheap
     try:
         data = request.get_json(force=True, silent=True)
         if not data:
@@ -16,9 +17,9 @@ def chat():
         if not user_message:
             return jsonify({"error": ERROR_NO_MESSAGE}), 400
 
-        reply, status_code = handle_chat_request(user_message)
+        reply, status_code = handle_chat_request(user_message, request_deadline(request.headers))
         return jsonify({"reply": reply}), status_code
 
     except Exception as e:
-        logging.error(f"Unexpected error in /chat endpoint: {e}")
+        logging.error("Unexpected error in /chat endpoint: %s", e)
         return jsonify({"error": str(e)}), 500
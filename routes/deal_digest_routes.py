@@ -0,0 +1,70 @@
+from flask import Blueprint, request, jsonify
+import logging
+from utils.deadline import request_deadline
+from utils.http_cache import parse_fields, project
+
+deal_digest_routes = Blueprint("deal_digest_routes", __name__)
+
+@deal_digest_routes.route("/telegram/digest/add", methods=["GET"])
+def add_to_digest():
+    """
+    Scrape a product and queue it for the next deal digest instead of
+    posting it right away (no AI summary, no Telegram call).
+    Example:
+        /telegram/digest/add?url=https://amzn.to/4q2qwct
+    """
+    from services.amazon_service import expand_amazon_url, scrape_amazon_details
+    from scheduler.deal_digest_scheduler import enqueue_product
+
+    org_url = request.args.get("url")
+    if not org_url:
+        return jsonify({"error": "Missing 'url' parameter"}), 400
+
+    try:
+        deadline = request_deadline(request.headers)
+        full_url = expand_amazon_url(org_url, deadline)
+        product = scrape_amazon_details(full_url, org_url, deadline)
+        if "error" in product:
+            return jsonify({"error": "Failed to fetch product details", "details": product}), 502
+
+        buffered = enqueue_product(product)
+        return jsonify({
+            "queued": True,
+            "buffered": buffered,
+            "product": project(product, parse_fields(request.args.get("fields"))),
+        })
+
+    except Exception as e:
+        logging.error("❌ Error in /telegram/digest/add: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@deal_digest_routes.route("/telegram/digest", methods=["GET"])
+def preview_digest():
+    """
+    The buffered products in digest order, with their ranking score.
+    """
+    from scheduler.deal_digest_scheduler import buffered_products, rank_products, score
+
+    products = buffered_products()
+    ranked = rank_products(products)
+    return jsonify({
+        "buffered": len(products),
+        "digest": [{**product, "score": round(score(product), 3)} for product in ranked],
+    })
+
+@deal_digest_routes.route("/telegram/digest/send", methods=["POST"])
+def send_digest_now():
+    """
+    Post the current digest immediately and start a new window.
+    """
+    from scheduler.deal_digest_scheduler import send_digest
+
+    try:
+        result = send_digest()
+        if not result.get("success"):
+            return jsonify({"error": "Failed to send digest", "details": result}), 502
+        return jsonify(result)
+
+    except Exception as e:
+        logging.error("❌ Error in /telegram/digest/send: %s", e)
+        return jsonify({"error": str(e)}), 500
@@ -1,8 +1,7 @@
 from flask import Blueprint, request, jsonify
 import logging
-from services.amazon_service import expand_amazon_url, scrape_amazon_details
-from services.send_amazon_product_to_telegram_service import send_amazon_product_to_telegram
-from services.chat_service import handle_chat_request
+from utils.deadline import request_deadline
+from utils.http_cache import parse_fields, project
 
 send_amazon_product_to_telegram_bp = Blueprint("send_amazon_product_to_telegram_bp", __name__)
 
@@ -11,58 +10,40 @@ def send_amazon_product_to_telegram_route():
     """
     Fetch product info from Amazon using the existing amazon_service,
     generate an AI summary via OpenRouter, and send that data to Telegram.
+    The summary + Telegram post run while the secondary fields are still
+    being extracted (see services/product_pipeline.py).
+    `fields=title,price,...` limits the returned product to those keys.
     Example:
         /telegram/send-amazon-product?url=https://amzn.to/4q2qwct
     """
+    from services.amazon_service import expand_amazon_url
+    from services.product_pipeline import run_send_product_pipeline
+
     org_url = request.args.get("url")
     if not org_url:
         return jsonify({"error": "Missing 'url' parameter"}), 400
 
     try:
-        # Step 1: Expand short URL if needed
-        full_url = expand_amazon_url(org_url)
-
-        # Step 2: Scrape product details using amazon_service
-        product_data = scrape_amazon_details(full_url, org_url)
-        if "error" in product_data:
-            return jsonify({"error": "Failed to fetch product details", "details": product_data}), 500
-
-        # --- Step 2.5: Generate AI message using OpenRouter ---
-        user_message = (
-            f"Product Details:\n"
-            f"Title: {product_data.get('title', 'N/A')}\n"
-            f"Price: {product_data.get('price', 'N/A')}\n"
-            f"discount: {product_data.get('discount', 'N/A')}\n"
-           # f"Discount: {product_data.get('discount', 'N/A')}\n"
-           # f"Link: {product_data.get('orgURl', 'N/A')}\n\n"
-            "Provide a short ,concise and engaging meassage for Telegram"
+        deadline = request_deadline(request.headers)
 
-        )
-
-        ai_reply, status = handle_chat_request(user_message)
-        if status != 200:
-            logging.warning(f"AI chat service failed: {ai_reply}")
-            ai_reply = None  # fallback in case AI fails
+        # Step 1: Expand short URL if needed
+        full_url = expand_amazon_url(org_url, deadline)
 
-        # Step 3: Send scraped data to Telegram (including AI summary if available)
-        telegram_response = send_amazon_product_to_telegram(product_data, ai_reply)
+        # Step 2: Scrape -> AI summary -> Telegram, staged
+        result = run_send_product_pipeline(full_url, org_url, deadline)
+        if "error" in result:
+            return jsonify({"error": "Failed to fetch product details", "details": result}), 500
 
-        return jsonify({
+        response = {
             
-            "product_title": product_data,
-            "ai_summary": ai_reply,
+            "product_title": project(result["product"], parse_fields(request.args.get("fields"))),
+            "ai_summary": result["ai_summary"],
            
-        })
-
-        #    # Step 3: Send scraped data to Telegram (including AI summary if available)
-        # telegram_response = send_amazon_product_to_telegram(product_data, ai_reply)
-        #  return jsonify({
-        #     "status": "success" if telegram_response.get("success") else "failed",
-        #     "product_title": product_data.get("title"),
-        #     "ai_summary": ai_reply,
-        #     "telegram_response": telegram_response
-        # })
+        }
+        if result.get("partial"):
+            response["partial"] = True
+        return jsonify(response)
 
     except Exception as e:
-        logging.error(f"❌ Error in /telegram/send-amazon-product: {e}")
+        logging.error("❌ Error in /telegram/send-amazon-product: %s", e)
         return jsonify({"error": str(e)}), 500
@@ -1,7 +1,6 @@
 from flask import Blueprint, request, jsonify
 import logging
-from services.chat_service import handle_chat_request
-from services.telegram_service import send_telegram_message
+from utils.deadline import request_deadline
 from urls import ERROR_INVALID_JSON, ERROR_NO_MESSAGE
 
 telegram_routes = Blueprint("telegram_routes", __name__)
@@ -15,6 +14,8 @@ def send_quote_from_chat():
         "message": "Give me an inspiring quote"
     }
     """
+    from services.chat_service import handle_chat_request
+    from services.telegram_service import send_telegram_message
     try:
         data = request.get_json(force=True, silent=True)
         if not data:
@@ -24,14 +25,16 @@ def send_quote_from_chat():
         if not user_message:
             return jsonify({"error": ERROR_NO_MESSAGE}), 400
 
+        deadline = request_deadline(request.headers)
+
         # Step 1 — Get reply from chat service
-        reply, status_code = handle_chat_request(user_message)
+        reply, status_code = handle_chat_request(user_message, deadline)
 
         if status_code != 200:
             return jsonify({"error": reply}), status_code
 
         # Step 2 — Send reply to Telegram
-        telegram_result, telegram_status = send_telegram_message(reply)
+        telegram_result, telegram_status = send_telegram_message(reply, deadline)
 
         return jsonify({
             "reply": reply,
@@ -40,5 +43,5 @@ def send_quote_from_chat():
         }), 200
 
     except Exception as e:
-        logging.error(f"Error in /send-quote-from-chat: {e}")
+        logging.error("Error in /send-quote-from-chat: %s", e)
         return jsonify({"error": str(e)}), 500
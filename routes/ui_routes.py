@@ -1,8 +1,9 @@
-from flask import Blueprint, render_template
+from flask import Blueprint
+from utils.http_cache import render_cached
 
 ui_ai_routes = Blueprint("ui_ai_routes", __name__)
 
 @ui_ai_routes.route("/amazon-ai", methods=["GET"])
 def amazon_ai_ui():
-    """Render UI for Amazon to Telegram with AI"""
-    return render_template("amazon_ai_form.html")
+    """Render UI for Amazon to Telegram with AI (rendered once, then served with an ETag)"""
+    return render_cached("amazon_ai_form.html")
@@ -0,0 +1,255 @@
+# scheduler/deal_digest_scheduler.py
+"""
+Deal digest: one LLM call and one Telegram post per window instead of per product.
+
+    /telegram/digest/add --scrape--> buffer (deduplicated by ASIN / URL)
+    every DIGEST_WINDOW_MINUTES ---> rank by discount + rating, top DIGEST_MAX_ITEMS
+                                 --> one OpenRouter call for the intro
+                                 --> one sendMessage (or a sendMediaGroup album
+                                     plus one sendMessage for the rest)
+
+Products that were not posted (below the top DIGEST_MAX_ITEMS, cut by the
+message limit, or after a failed post) stay buffered for the next window;
+products older than DIGEST_MAX_AGE_HOURS are dropped.
+
+The buffer is kept in memory and mirrored to DIGEST_BUFFER_PATH so a restart
+inside a window does not drop queued deals. It is per process: run the
+digest with a single worker.
+"""
+import html
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from config import (
+    DIGEST_BUFFER_PATH, DIGEST_ENABLED, DIGEST_MAX_AGE_HOURS, DIGEST_MAX_ITEMS, DIGEST_MEDIA_GROUP,
+    DIGEST_WINDOW_MINUTES,
+)
+from services.marketplaces import DEFAULT_MARKETPLACE, parse_percent, parse_rating
+
+MAX_BUFFERED = 500  # hard cap so a runaway sale event can't grow the buffer unbounded
+DIGEST_FIELDS = ("title", "price", "discount", "rating", "review_count", "image", "url", "orgUrl", "asin", "marketplace")
+DISCOUNT_WEIGHT = 0.7  # share of the score taken by the discount; the rest is the rating
+DEFAULT_INTRO = "🔥 Top deals right now"
+INTRO_LIMIT = 1000  # characters; keeps room for the product list in one message
+
+_lock = threading.Lock()
+_save_lock = threading.Lock()  # snapshot + write as one step, so writes land in snapshot order
+_buffer = {}  # key -> slim product, in arrival order
+_scheduler = None
+
+
+# ---------------- Buffer ---------------- #
+def _key(product: dict) -> str:
+    asin = product.get("asin")
+    if asin and asin != "Not Found":
+        return f"{product.get('marketplace', DEFAULT_MARKETPLACE)}:{asin}"
+    return product.get("url") or product.get("orgUrl", "")
+
+
+def _load():
+    if not os.path.exists(DIGEST_BUFFER_PATH):
+        return
+    try:
+        with open(DIGEST_BUFFER_PATH, encoding="utf-8") as fh:
+            _buffer.update(json.load(fh))
+        logging.info("Restored %s buffered digest product(s)", len(_buffer))
+    except (OSError, ValueError) as e:
+        logging.warning("Could not load digest buffer from %s: %s", DIGEST_BUFFER_PATH, e)
+
+
+def _save():
+    # Without _save_lock an older snapshot could be written after a newer one
+    # (e.g. after _drain emptied the buffer) and bring posted deals back on restart
+    with _save_lock:
+        with _lock:
+            payload = json.dumps(_buffer, ensure_ascii=False)
+        try:
+            os.makedirs(os.path.dirname(DIGEST_BUFFER_PATH) or ".", exist_ok=True)
+            tmp = f"{DIGEST_BUFFER_PATH}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                fh.write(payload)
+            os.replace(tmp, DIGEST_BUFFER_PATH)
+        except OSError as e:
+            logging.warning("Could not persist digest buffer to %s: %s", DIGEST_BUFFER_PATH, e)
+
+
+def enqueue_product(product: dict) -> int:
+    """
+    Add a scraped product to the current window; a product already buffered
+    is replaced by the fresher scrape. Returns the buffer size.
+    """
+    slim = {field: product[field] for field in DIGEST_FIELDS if field in product}
+    slim["queued_at"] = time.time()
+    with _lock:
+        _buffer.pop(_key(slim), None)
+        _buffer[_key(slim)] = slim
+        while len(_buffer) > MAX_BUFFERED:
+            _buffer.pop(next(iter(_buffer)))
+        size = len(_buffer)
+    _save()
+    return size
+
+
+def buffered_products() -> list:
+    with _lock:
+        return list(_buffer.values())
+
+
+def _drain() -> list:
+    """Empty the buffer; products older than DIGEST_MAX_AGE_HOURS are dropped here."""
+    cutoff = time.time() - DIGEST_MAX_AGE_HOURS * 3600
+    with _lock:
+        products = list(_buffer.values())
+        _buffer.clear()
+    _save()
+    fresh = [p for p in products if p.get("queued_at", 0) >= cutoff]
+    if len(fresh) < len(products):
+        logging.info("Dropped %s digest product(s) older than %sh", len(products) - len(fresh), DIGEST_MAX_AGE_HOURS)
+    return fresh
+
+
+def _requeue(products: list):
+    """Put products that were not posted back for the next window (a newer scrape wins)."""
+    with _lock:
+        for product in products:
+            _buffer.setdefault(_key(product), product)
+    _save()
+
+
+# ---------------- Ranking ---------------- #
+def score(product: dict) -> float:
+    """
+    0..1: DISCOUNT_WEIGHT * discount% + the rest * rating/5.
+    A missing discount or rating counts as 0 for its share.
+    """
+    marketplace = product.get("marketplace", DEFAULT_MARKETPLACE)
+    discount = parse_percent(product.get("discount")) or 0
+    rating = parse_rating(product.get("rating"), marketplace) or 0
+    return DISCOUNT_WEIGHT * min(discount, 100) / 100 + (1 - DISCOUNT_WEIGHT) * rating / 5
+
+
+def rank_products(products: list, limit: int = DIGEST_MAX_ITEMS) -> list:
+    return sorted(products, key=score, reverse=True)[:limit]
+
+
+# ---------------- Formatting ---------------- #
+def _found(value) -> str:
+    return "" if not value or value == "Not Found" else str(value)
+
+
+def _link(product: dict) -> str:
+    return product.get("orgUrl") or product.get("url", "")
+
+
+def _stats(product: dict) -> str:
+    parts = [_found(product.get("price"))]
+    discount = parse_percent(product.get("discount"))
+    if discount:
+        parts.append(f"-{discount}%")
+    rating = parse_rating(product.get("rating"), product.get("marketplace", DEFAULT_MARKETPLACE))
+    if rating:
+        parts.append(f"⭐ {rating:g}")
+    return " · ".join(p for p in parts if p)
+
+
+def build_digest_prompt(products: list) -> str:
+    lines = [
+        f"{rank}. {product.get('title', 'N/A')} | {_stats(product) or 'N/A'}"
+        for rank, product in enumerate(products, 1)
+    ]
+    return (
+        "Today's deals:\n"
+        + "\n".join(lines)
+        + "\nWrite a short, engaging 2-3 sentence intro for a Telegram post listing these deals. "
+        "Mention the best one or two; do not repeat the whole list or add links."
+    )
+
+
+def _entry(rank: int, product: dict, title_chars: int = 120) -> str:
+    title = html.escape(_found(product.get("title"))[:title_chars] or "Amazon deal")
+    line = f"{rank}. <b>{title}</b>"
+    stats = _stats(product)
+    if stats:
+        line += f"\n{html.escape(stats)}"
+    return f"{line}\n{html.escape(_link(product))}"
+
+
+# ---------------- Digest job ---------------- #
+def _intro(products: list) -> str:
+    from services.chat_service import handle_chat_request
+
+    reply, status = handle_chat_request(build_digest_prompt(products))
+    if status != 200:
+        logging.warning("Digest intro unavailable (%s), posting without it: %s", status, reply)
+        return DEFAULT_INTRO
+    return reply.strip()[:INTRO_LIMIT]
+
+
+def send_digest() -> dict:
+    """
+    Post the top DIGEST_MAX_ITEMS buffered products as one digest and start
+    a new window; everything not posted carries over to the next one.
+    """
+    from services.send_amazon_product_to_telegram_service import send_digest_to_telegram
+    from utils.logger import log_stage
+
+    products = _drain()
+    if not products:
+        logging.info("Deal digest skipped: no products buffered.")
+        return {"success": True, "count": 0, "skipped": True}
+
+    ranked = rank_products(products)
+    entries = [
+        {"rank": rank, "caption": _entry(rank, product), "image": _found(product.get("image"))}
+        for rank, product in enumerate(ranked, 1)
+    ]
+    try:
+        with log_stage("digest", buffered=len(products), ranked=len(ranked)) as stage:
+            intro = _intro(ranked)
+            result = send_digest_to_telegram(intro, entries, media_group=DIGEST_MEDIA_GROUP)
+            stage["posted"] = len(result.get("posted_ranks", []))
+    except Exception:
+        _requeue(products)
+        raise
+
+    posted_ranks = set(result.get("posted_ranks", []))
+    posted_ids = {id(product) for rank, product in enumerate(ranked, 1) if rank in posted_ranks}
+    carried = [product for product in products if id(product) not in posted_ids]
+    posted = len(posted_ids)
+    _requeue(carried)
+    if not result.get("success"):
+        return {**result, "count": posted, "carried_over": len(carried)}
+    logging.info("✅ Deal digest sent: %s posted, %s carried over.", posted, len(carried))
+    return {**result, "count": posted, "buffered": len(products), "carried_over": len(carried), "intro": intro}
+
+
+def _scheduled_digest():
+    """Scheduler entry point: runs send_digest under its own request id for the logs."""
+    from utils.logger import reset_request_id, set_request_id
+
+    token = set_request_id(f"digest-{uuid.uuid4().hex[:8]}")
+    try:
+        send_digest()
+    except Exception as e:
+        logging.error("Error in deal digest job: %s", e)
+    finally:
+        reset_request_id(token)
+
+
+def start_digest_scheduler():
+    """Start the digest job (once per process) when DIGEST_ENABLED is set."""
+    global _scheduler
+    if not DIGEST_ENABLED or _scheduler is not None:
+        return
+    from apscheduler.schedulers.background import BackgroundScheduler
+    _scheduler = BackgroundScheduler()
+    _scheduler.add_job(_scheduled_digest, "interval", minutes=DIGEST_WINDOW_MINUTES, max_instances=1, coalesce=True)
+    _scheduler.start()
+    logging.info("Deal digest scheduler started. Window: %s minute(s).", DIGEST_WINDOW_MINUTES)
+
+
+_load()
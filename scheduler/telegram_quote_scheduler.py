@@ -1,4 +1,3 @@
-from apscheduler.schedulers.background import BackgroundScheduler
 import logging
 import requests
 import json
@@ -18,12 +17,12 @@ def send_quote_to_telegram():
         response = requests.post(url, headers=headers, data=json.dumps(body), timeout=10)
 
         if response.status_code == 200:
-            logging.info(f"Quote sent successfully: {response.json()}")
+            logging.info("Quote sent successfully: %s", response.json())
         else:
-            logging.error(f"Failed to send quote: {response.status_code} {response.text}")
+            logging.error("Failed to send quote: %s %s", response.status_code, response.text)
 
     except Exception as e:
-        logging.error(f"Error in scheduler task: {e}")
+        logging.error("Error in scheduler task: %s", e)
 
 
 import os
@@ -34,4 +33,4 @@ def start_scheduler():
         scheduler = BackgroundScheduler()
         scheduler.add_job(send_quote_to_telegram, "interval", minutes=SCHEDULER_INTERVAL_MINUTES)
         scheduler.start()
-        logging.info(f"Telegram quote scheduler started. Interval: {SCHEDULER_INTERVAL_MINUTES} minute(s).")
+        logging.info("Telegram quote scheduler started. Interval: %s minute(s).", SCHEDULER_INTERVAL_MINUTES)
@@ -1,31 +1,54 @@
+import asyncio
 import requests
-from bs4 import BeautifulSoup
 import logging
 import re
+from utils.deadline import DeadlineExceeded, arequest_within, out_of_time, request_within
+from utils.logger import log_stage
+from services.async_http import get_async_client
+from services.selector_stats import selector_stats
+from services.marketplaces import DEFAULT_MARKETPLACE, detect_marketplace, get_marketplace, parse_price, selectors_for
+from services.session_profiles import is_captcha_html
+
+
+class CaptchaError(Exception):
+    """Amazon served its bot-check page instead of the product."""
 
 # ---------------- Helper Functions ---------------- #
-def safe_text(soup, selectors):
+def safe_text(soup, selectors, field=None):
     """
     Try multiple selectors and return the first non-empty text.
+    With `field`, the outcome is recorded for hit-rate monitoring only: the
+    first match decides the value, so the configured order is kept.
     """
     if not isinstance(selectors, list):
         selectors = [selectors]
-    for sel in selectors:
+    for i, sel in enumerate(selectors):
         el = soup.select_one(sel)
-        if el and el.get_text(strip=True):
-            return el.get_text(strip=True)
+        text = el.get_text(strip=True) if el else None
+        if text:
+            if field:
+                selector_stats.record_chain(f"static:{field}", selectors[:i + 1], sel)
+            return text
+    if field:
+        selector_stats.record_chain(f"static:{field}", selectors, None)
     return None
 
-def safe_attr(soup, selectors, attr):
+def safe_attr(soup, selectors, attr, field=None):
     """
     Try multiple selectors and return the first non-empty attribute.
+    With `field`, the outcome is recorded for hit-rate monitoring only: the
+    first match decides the value, so the configured order is kept.
     """
     if not isinstance(selectors, list):
         selectors = [selectors]
-    for sel in selectors:
+    for i, sel in enumerate(selectors):
         el = soup.select_one(sel)
         if el and attr in el.attrs:
+            if field:
+                selector_stats.record_chain(f"static:{field}", selectors[:i + 1], sel)
             return el[attr]
+    if field:
+        selector_stats.record_chain(f"static:{field}", selectors, None)
     return None
 
 def safe_list(soup, selectors):
@@ -44,102 +67,225 @@ def safe_list(soup, selectors):
     return result if result else None
 
 # ---------------- Main Scraper ---------------- #
-def expand_amazon_url(short_url: str) -> str:
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/127.0.0.0 Safari/537.36"
+    )
+}
+
+def expand_amazon_url(short_url: str, deadline=None) -> str:
     """
     Expand shortened Amazon URLs (amzn.to) to full URLs.
     """
     try:
-        logging.info(f"Expanding shortened URL: {short_url}")
-        response = requests.head(short_url, allow_redirects=True, timeout=10)
+        logging.debug("Expanding shortened URL: %s", short_url)
+        with log_stage("expand_url"):
+            response = request_within("HEAD", short_url, deadline, 10, allow_redirects=True)
         return response.url
     except requests.exceptions.RequestException as e:
         raise Exception(f"Error expanding URL: {e}")
 
-def scrape_amazon_details(url: str, orgUrl: str) -> dict:
+# Fields the Telegram post uses (caption prompt + photo); the send-product
+# pipeline extracts these first and starts the LLM call before the rest
+CRITICAL_FIELDS = ("title", "price", "discount", "image")
+
+# Key order of the product dict
+PRODUCT_KEYS = [
+    "url", "orgUrl", "marketplace", "title", "price", "price_value", "currency", "deal_price", "rating", "discount", "offer", "image",
+    "description", "availability", "prime_eligible", "review_count", "asin", "brand", "category",
+    "bullet_points", "dimensions", "weight", "color", "size", "seller", "shipping", "warranty",
+    "reviews_link", "best_sellers_rank", "manufacturer",
+]
+
+def parse_html(html: str):
+    from bs4 import BeautifulSoup  # imported on first parse; most of the app never needs it
+    with log_stage("amazon_parse", scraper="static", bytes=len(html)):
+        return BeautifulSoup(html, "html.parser")
+
+def extract_critical_fields(soup, marketplace: str = DEFAULT_MARKETPLACE) -> dict:
+    """
+    Extract the CRITICAL_FIELDS only (plus the parsed price for `marketplace`).
+    """
+    price_sel = selectors_for(marketplace, "price", [".a-price .a-offscreen", "#priceblock_ourprice", "#priceblock_dealprice"])
+    discount_sel = selectors_for(marketplace, "discount", [".savingsPercentage"])
+    image_sel = selectors_for(marketplace, "image", ["#landingImage", "#imgTagWrapperId img", ".imgTagWrapper img"])
+
+    price = safe_text(soup, price_sel, field=f"{marketplace}:price")
+    return {
+        "marketplace": marketplace,
+        "title": safe_text(soup, "#productTitle", field=f"{marketplace}:title") or "Not Found",
+        "price": price or "Not Found",
+        "price_value": parse_price(price, marketplace),
+        "currency": get_marketplace(marketplace)["currency"],
+        "discount": safe_text(soup, discount_sel, field=f"{marketplace}:discount") or "Not Found",
+        # Full-size original when the page has one; `src` is a ~300px preview
+        "image": (safe_attr(soup, image_sel, "data-old-hires", field=f"{marketplace}:image_hires")
+                  or safe_attr(soup, image_sel, "src", field=f"{marketplace}:image") or "Not Found"),
+    }
+
+def extract_secondary_fields(soup, marketplace: str = DEFAULT_MARKETPLACE) -> dict:
+    """
+    Extract every field that is not in CRITICAL_FIELDS.
+    """
+    # ---------------- Selectors ---------------- #
+    availability_sel = selectors_for(marketplace, "availability", ["#availability span", "#availability_feature_div"])
+    prime_sel = selectors_for(marketplace, "prime", [".a-icon-prime", "#primeExclusiveBadge_feature_div"])
+    review_count_sel = selectors_for(marketplace, "review_count", ["#acrCustomerReviewText"])
+    asin_sel = selectors_for(marketplace, "asin", ["#ASIN", "input[name='ASIN']"])
+    brand_sel = selectors_for(marketplace, "brand", ["#bylineInfo", ".brand"])
+    category_sel = selectors_for(marketplace, "category", ["#wayfinding-breadcrumbs_feature_div li a"])
+    bullet_points_sel = selectors_for(marketplace, "bullet_points", ["#feature-bullets ul li span"])
+    dimensions_sel = selectors_for(marketplace, "dimensions", ["#productDetails_techSpec_section_1 td.a-size-base", "#productDetails_detailBullets_sections1 td.a-size-base"])
+    weight_sel = selectors_for(marketplace, "weight", ["#productDetails_techSpec_section_1 td.a-size-base", "#productDetails_detailBullets_sections1 td.a-size-base"])
+    color_sel = selectors_for(marketplace, "color", ["#variation_color_name .selection"])
+    size_sel = selectors_for(marketplace, "size", ["#variation_size_name .selection"])
+    seller_sel = selectors_for(marketplace, "seller", ["#sellerProfileTriggerId", "#merchant-info"])
+    shipping_sel = selectors_for(marketplace, "shipping", ["#ourprice_shippingmessage", "#fast-track-message"])
+    warranty_sel = selectors_for(marketplace, "warranty", ["#warranty", "#productWarranty_feature_div"])
+    reviews_link_sel = selectors_for(marketplace, "reviews_link", ["#reviews-medley-footer a", "#seeAllReviews"])
+    best_sellers_rank_sel = selectors_for(marketplace, "best_sellers_rank", ["#productDetails_detailBullets_sections1 li", "#SalesRank"])
+    manufacturer_sel = selectors_for(marketplace, "manufacturer", ["#bylineInfo_feature_div", "#productDetails_detailBullets_sections1"])
+
+    # ---------------- Extract Values ---------------- #
+    bullets = safe_list(soup, bullet_points_sel)
+    description = " ".join(bullets) if bullets else None
+
+    # Parse dimensions & weight (simple fallback)
+    dimensions_text = safe_text(soup, dimensions_sel, field=f"{marketplace}:dimensions") or ""
+    weight_text = safe_text(soup, weight_sel, field=f"{marketplace}:weight") or ""
+    weight_match = re.search(r"(\d+\.?\d*)\s?(kg|g|lbs|oz)", weight_text)
+    weight = weight_match.group(0) if weight_match else None
+
+    # Best seller rank (parse #1 in category)
+    best_rank_text = safe_text(soup, best_sellers_rank_sel, field=f"{marketplace}:best_sellers_rank") or ""
+    rank_match = re.search(r"#\d+", best_rank_text)
+    best_sellers_rank = rank_match.group(0) if rank_match else None
+
+    return {
+        "deal_price": safe_text(soup, [".a-price .a-offscreen"], field=f"{marketplace}:deal_price") or "Not Found",
+        "rating": safe_text(soup, ["i.a-icon-star span.a-icon-alt"], field=f"{marketplace}:rating") or "Not Found",
+        "offer": safe_text(soup, ["#dealBadgePrimaryText"], field=f"{marketplace}:offer") or "Not Found",
+        "description": description or "Not Found",
+        "availability": safe_text(soup, availability_sel, field=f"{marketplace}:availability") or "Not Found",
+        "prime_eligible": "Yes" if safe_text(soup, prime_sel, field=f"{marketplace}:prime_eligible") else "No",
+        "review_count": safe_text(soup, review_count_sel, field=f"{marketplace}:review_count") or "Not Found",
+        "asin": safe_text(soup, asin_sel, field=f"{marketplace}:asin") or "Not Found",
+        "brand": safe_text(soup, brand_sel, field=f"{marketplace}:brand") or "Not Found",
+        "category": safe_list(soup, category_sel) or [],
+        "bullet_points": bullets or [],
+        "dimensions": dimensions_text or "Not Found",
+        "weight": weight or "Not Found",
+        "color": safe_text(soup, color_sel, field=f"{marketplace}:color") or "Not Found",
+        "size": safe_text(soup, size_sel, field=f"{marketplace}:size") or "Not Found",
+        "seller": safe_text(soup, seller_sel, field=f"{marketplace}:seller") or "Amazon",
+        "shipping": safe_text(soup, shipping_sel, field=f"{marketplace}:shipping") or "Not Found",
+        "warranty": safe_text(soup, warranty_sel, field=f"{marketplace}:warranty") or "Not Found",
+        "reviews_link": safe_attr(soup, reviews_link_sel, "href", field=f"{marketplace}:reviews_link") or "Not Found",
+        "best_sellers_rank": best_sellers_rank or "Not Found",
+        "manufacturer": safe_text(soup, manufacturer_sel, field=f"{marketplace}:manufacturer") or "Not Found"
+    }
+
+def assemble_product(url: str, orgUrl: str, *parts: dict) -> dict:
+    """
+    Merge extracted field groups into the product dict, in PRODUCT_KEYS order.
+    """
+    merged = {"url": url, "orgUrl": orgUrl}
+    for part in parts:
+        merged.update(part)
+    return {key: merged[key] for key in PRODUCT_KEYS if key in merged}
+
+def parse_amazon_page(html: str, url: str, orgUrl: str, deadline=None) -> dict:
+    """
+    Parse a fetched Amazon product page into the product dict.
+    CPU-bound; the async scraper runs it in a worker thread.
+    When the deadline has passed after the critical fields, the secondary
+    ones are skipped and the result is flagged "partial".
+    """
+    marketplace = detect_marketplace(url)
+    soup = parse_html(html)
+    critical = extract_critical_fields(soup, marketplace)
+    if out_of_time(deadline):
+        return {**assemble_product(url, orgUrl, critical), "partial": True}
+    return assemble_product(url, orgUrl, critical, extract_secondary_fields(soup, marketplace))
+
+def request_headers(url: str) -> dict:
+    """Default headers plus the Accept-Language of the URL's marketplace."""
+    preset = get_marketplace(detect_marketplace(url))
+    return {**HEADERS, "Accept-Language": preset["accept_language"]}
+
+def fetch_amazon_page(url: str, deadline=None) -> str:
+    logging.debug("Fetching Amazon product page: %s", url)
+    with log_stage("amazon_fetch", scraper="static"):
+        response = request_within("GET", url, deadline, 15, headers=request_headers(url))
+        response.raise_for_status()
+    if is_captcha_html(response.text):
+        raise CaptchaError(f"Blocked by Amazon bot check (captcha): {url}")
+    return response.text
+
+def scrape_amazon_details(url: str, orgUrl: str, deadline=None) -> dict:
   
     """
     Scrape Amazon product page dynamically and return detailed info.
     """
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/127.0.0.0 Safari/537.36"
-        )
-    }
+    try:
+        return parse_amazon_page(fetch_amazon_page(url, deadline), url, orgUrl, deadline)
+
+    except CaptchaError as e:
+        logging.warning("%s", e)
+        return {"error": str(e), "captcha": True}
+    except DeadlineExceeded as e:
+        logging.warning("Amazon scrape for %s: %s", url, e)
+        return {"error": str(e)}
+    except requests.exceptions.RequestException as e:
+        logging.error("Request error: %s", e)
+        return {"error": f"Request error: {e}"}
+    except Exception as e:
+        logging.exception("Scraping error")
+        return {"error": str(e)}
 
+# ---------------- Async Scraper (ASGI mode) ---------------- #
+async def expand_amazon_url_async(short_url: str, deadline=None) -> str:
+    """
+    Async variant of expand_amazon_url.
+    """
+    import httpx
     try:
-        logging.info(f"Fetching Amazon product page: {url}")
-        response = requests.get(url, headers=headers, timeout=15)
+        logging.debug("Expanding shortened URL: %s", short_url)
+        with log_stage("expand_url"):
+            response = await arequest_within(get_async_client(), "HEAD", short_url, deadline, 10, follow_redirects=True)
+        return str(response.url)
+    except httpx.HTTPError as e:
+        raise Exception(f"Error expanding URL: {e}")
+
+async def fetch_amazon_page_async(url: str, deadline=None) -> str:
+    logging.debug("Fetching Amazon product page: %s", url)
+    with log_stage("amazon_fetch", scraper="static"):
+        response = await arequest_within(get_async_client(), "GET", url, deadline, 15, headers=request_headers(url))
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # ---------------- Selectors ---------------- #
-        availability_sel = ["#availability span", "#availability_feature_div"]
-        prime_sel = [".a-icon-prime", "#primeExclusiveBadge_feature_div"]
-        review_count_sel = ["#acrCustomerReviewText"]
-        asin_sel = ["#ASIN", "input[name='ASIN']"]
-        brand_sel = ["#bylineInfo", ".brand"]
-        category_sel = ["#wayfinding-breadcrumbs_feature_div li a"]
-        bullet_points_sel = ["#feature-bullets ul li span"]
-        dimensions_sel = ["#productDetails_techSpec_section_1 td.a-size-base", "#productDetails_detailBullets_sections1 td.a-size-base"]
-        weight_sel = ["#productDetails_techSpec_section_1 td.a-size-base", "#productDetails_detailBullets_sections1 td.a-size-base"]
-        color_sel = ["#variation_color_name .selection"]
-        size_sel = ["#variation_size_name .selection"]
-        seller_sel = ["#sellerProfileTriggerId", "#merchant-info"]
-        shipping_sel = ["#ourprice_shippingmessage", "#fast-track-message"]
-        warranty_sel = ["#warranty", "#productWarranty_feature_div"]
-        reviews_link_sel = ["#reviews-medley-footer a", "#seeAllReviews"]
-        best_sellers_rank_sel = ["#productDetails_detailBullets_sections1 li", "#SalesRank"]
-        manufacturer_sel = ["#bylineInfo_feature_div", "#productDetails_detailBullets_sections1"]
-
-        # ---------------- Extract Values ---------------- #
-        bullets = safe_list(soup, bullet_points_sel)
-        description = " ".join(bullets) if bullets else None
-
-        # Parse dimensions & weight (simple fallback)
-        dimensions_text = safe_text(soup, dimensions_sel) or ""
-        weight_text = safe_text(soup, weight_sel) or ""
-        weight_match = re.search(r"(\d+\.?\d*)\s?(kg|g|lbs|oz)", weight_text)
-        weight = weight_match.group(0) if weight_match else None
-
-        # Best seller rank (parse #1 in category)
-        best_rank_text = safe_text(soup, best_sellers_rank_sel) or ""
-        rank_match = re.search(r"#\d+", best_rank_text)
-        best_sellers_rank = rank_match.group(0) if rank_match else None
-
-        return {
-            "url": url,
-            "orgUrl": orgUrl,
-            "title": safe_text(soup, "#productTitle") or "Not Found",
-            "price": safe_text(soup, [".a-price .a-offscreen", "#priceblock_ourprice", "#priceblock_dealprice"]) or "Not Found",
-            "deal_price": safe_text(soup, [".a-price .a-offscreen"]) or "Not Found",
-            "rating": safe_text(soup, ["i.a-icon-star span.a-icon-alt"]) or "Not Found",
-            "discount": safe_text(soup, [".savingsPercentage"]) or "Not Found",
-            "offer": safe_text(soup, ["#dealBadgePrimaryText"]) or "Not Found",
-            "image": safe_attr(soup, ["#landingImage", "#imgTagWrapperId img"], "src") or "Not Found",
-            "description": description or "Not Found",
-            "availability": safe_text(soup, availability_sel) or "Not Found",
-            "prime_eligible": "Yes" if safe_text(soup, prime_sel) else "No",
-            "review_count": safe_text(soup, review_count_sel) or "Not Found",
-            "asin": safe_text(soup, asin_sel) or "Not Found",
-            "brand": safe_text(soup, brand_sel) or "Not Found",
-            "category": safe_list(soup, category_sel) or [],
-            "bullet_points": bullets or [],
-            "dimensions": dimensions_text or "Not Found",
-            "weight": weight or "Not Found",
-            "color": safe_text(soup, color_sel) or "Not Found",
-            "size": safe_text(soup, size_sel) or "Not Found",
-            "seller": safe_text(soup, seller_sel) or "Amazon",
-            "shipping": safe_text(soup, shipping_sel) or "Not Found",
-            "warranty": safe_text(soup, warranty_sel) or "Not Found",
-            "reviews_link": safe_attr(soup, reviews_link_sel, "href") or "Not Found",
-            "best_sellers_rank": best_sellers_rank or "Not Found",
-            "manufacturer": safe_text(soup, manufacturer_sel) or "Not Found"
-        }
+    if is_captcha_html(response.text):
+        raise CaptchaError(f"Blocked by Amazon bot check (captcha): {url}")
+    return response.text
 
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Request error: {e}")
+async def scrape_amazon_details_async(url: str, orgUrl: str, deadline=None) -> dict:
+    """
+    Async variant of scrape_amazon_details: the fetch awaits on the shared
+    client, the BeautifulSoup parse runs off the event loop.
+    """
+    import httpx
+    try:
+        html = await fetch_amazon_page_async(url, deadline)
+        return await asyncio.to_thread(parse_amazon_page, html, url, orgUrl, deadline)
+
+    except CaptchaError as e:
+        logging.warning("%s", e)
+        return {"error": str(e), "captcha": True}
+    except DeadlineExceeded as e:
+        logging.warning("Amazon scrape for %s: %s", url, e)
+        return {"error": str(e)}
+    except httpx.HTTPError as e:
+        logging.error("Request error: %s", e)
         return {"error": f"Request error: {e}"}
     except Exception as e:
         logging.exception("Scraping error")
@@ -0,0 +1,37 @@
+# services/async_http.py
+import asyncio
+import logging
+from typing import Optional
+
+# httpx is only needed by the async serving mode; imported on first use
+_client: Optional["httpx.AsyncClient"] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_async_client() -> "httpx.AsyncClient":
+    """
+    Shared httpx.AsyncClient for the async serving mode.
+    One client = one connection pool, so OpenRouter/Telegram/Amazon
+    connections are reused across requests instead of re-handshaking.
+    Pooled connections belong to the loop that opened them, so a new
+    client is created if called from a different event loop.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        import httpx
+        _client = httpx.AsyncClient(
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_async_client():
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        logging.info("Closing shared async HTTP client...")
+        await _client.aclose()
+    _client = None
+    _client_loop = None
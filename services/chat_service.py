@@ -2,18 +2,13 @@
 import requests
 import logging
 import json
-from config import OPENROUTER_API_KEY, YOUR_SITE_URL, YOUR_SITE_NAME
-from urls import OPENROUTER_API_URL, OPENROUTER_MODEL_FREE, ERROR_NO_API_KEY, ERROR_NO_CONTENT, ERROR_TIMEOUT, ERROR_NON_JSON
-
-def handle_chat_request(user_message: str):
-    """
-    Sends user message to OpenRouter and returns the generated reply.
-    """
-
-    if not OPENROUTER_API_KEY:
-        logging.error(ERROR_NO_API_KEY)
-        return ERROR_NO_API_KEY, 500
+from utils.deadline import DeadlineExceeded, arequest_within, request_within
+from utils.logger import log_stage
+from services.async_http import get_async_client
+from config import OPENROUTER_API_KEY, OPENROUTER_API_URL, YOUR_SITE_URL, YOUR_SITE_NAME
+from urls import OPENROUTER_MODEL_FREE, ERROR_NO_API_KEY, ERROR_NO_CONTENT, ERROR_TIMEOUT, ERROR_NON_JSON
 
+def _build_request(user_message: str):
     headers = {
         "Authorization": f"Bearer {OPENROUTER_API_KEY}",
         "Content-Type": "application/json",
@@ -28,32 +23,74 @@ def handle_chat_request(user_message: str):
         "model": OPENROUTER_MODEL_FREE,
         "messages": [{"role": "user", "content": user_message}]
     }
+    return headers, payload
 
+def _parse_response(response):
+    """
+    Turn an OpenRouter response (requests or httpx) into (reply, status_code).
+    """
     try:
-        logging.info(f"Sending request to OpenRouter with model: {OPENROUTER_MODEL_FREE}")
-        response = requests.post(OPENROUTER_API_URL, headers=headers, json=payload, timeout=15)
+        result = response.json()
+    except json.JSONDecodeError:
+        logging.error("Failed to decode OpenRouter response as JSON")
+        return ERROR_NON_JSON, 502
+
+    if response.status_code != 200:
+        return result.get("error", {}).get("message", "API Error"), response.status_code
 
-        logging.info(f"OpenRouter returned status {response.status_code}")
+    reply = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+    if not reply:
+        logging.warning("No reply content found: %s", result)
+        return ERROR_NO_CONTENT, 500
 
-        try:
-            result = response.json()
-        except json.JSONDecodeError:
-            logging.error("Failed to decode OpenRouter response as JSON")
-            return ERROR_NON_JSON, 502
+    return reply, 200
 
-        if response.status_code != 200:
-            return result.get("error", {}).get("message", "API Error"), response.status_code
+def handle_chat_request(user_message: str, deadline=None):
+    """
+    Sends user message to OpenRouter and returns the generated reply.
+    """
+
+    if not OPENROUTER_API_KEY:
+        logging.error(ERROR_NO_API_KEY)
+        return ERROR_NO_API_KEY, 500
 
-        reply = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-        if not reply:
-            logging.warning(f"No reply content found: {result}")
-            return ERROR_NO_CONTENT, 500
+    headers, payload = _build_request(user_message)
+
+    try:
+        with log_stage("openrouter", model=OPENROUTER_MODEL_FREE) as stage:
+            response = request_within("POST", OPENROUTER_API_URL, deadline, 15, headers=headers, json=payload)
+            stage["status_code"] = response.status_code
+
+        return _parse_response(response)
+
+    except (requests.exceptions.Timeout, DeadlineExceeded):
+        logging.error("OpenRouter request timed out.")
+        return ERROR_TIMEOUT, 504
+    except Exception as e:
+        logging.error("Chat service error: %s", e)
+        return str(e), 500
+
+async def handle_chat_request_async(user_message: str, deadline=None):
+    """
+    Async variant of handle_chat_request for the ASGI app; same return contract.
+    """
+    import httpx
+    if not OPENROUTER_API_KEY:
+        logging.error(ERROR_NO_API_KEY)
+        return ERROR_NO_API_KEY, 500
+
+    headers, payload = _build_request(user_message)
+
+    try:
+        with log_stage("openrouter", model=OPENROUTER_MODEL_FREE) as stage:
+            response = await arequest_within(get_async_client(), "POST", OPENROUTER_API_URL, deadline, 15, headers=headers, json=payload)
+            stage["status_code"] = response.status_code
 
-        return reply, 200
+        return _parse_response(response)
 
-    except requests.exceptions.Timeout:
+    except (httpx.TimeoutException, DeadlineExceeded):
         logging.error("OpenRouter request timed out.")
         return ERROR_TIMEOUT, 504
     except Exception as e:
-        logging.error(f"Chat service error: {e}")
+        logging.error("Chat service error: %s", e)
         return str(e), 500
@@ -0,0 +1,330 @@
+# services/image_service.py
+"""
+Product photos for Telegram posts.
+
+    image URL --fetch once--> original, stored under its SHA-256
+              --Pillow------> variant resized to IMAGE_MAX_SIDE
+              --sendPhoto---> Telegram file_id, reused for every later post
+
+Files live in IMAGE_CACHE_DIR/<sha[:2]>/<sha>[_<side>].jpg and the least
+recently used ones are evicted past IMAGE_CACHE_MAX_MB. index.json maps
+source URLs to hashes and variants to file_ids, so a product that was
+posted before is sent by file_id without touching Amazon or the disk.
+Index changes are written by a short timer (and at exit), not inline.
+"""
+import asyncio
+import atexit
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Optional
+
+from config import IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_MB, IMAGE_MAX_SIDE
+from services.async_http import get_async_client
+from utils.deadline import arequest_within, request_within
+from utils.logger import log_stage
+
+IMAGE_FETCH_TIMEOUT = 5  # seconds
+MAX_IMAGE_BYTES = 10 * 1024 * 1024  # Telegram's upload limit for photos
+MAX_INDEX_ENTRIES = 10000
+INDEX_FLUSH_DELAY = 2.0  # seconds; index changes within this window are written once
+JPEG_QUALITY = 85
+
+IMAGE_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/127.0.0.0 Safari/537.36"
+    ),
+    "Accept": "image/avif,image/webp,image/*,*/*;q=0.8",
+}
+
+
+class ImageCache:
+    """Content-addressed image store with LRU eviction and a url/file_id index."""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, "index.json")
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # one index write at a time
+        self._flush_timer = None
+        self._urls = {}
+        self._file_ids = {}
+        self._size = None  # bytes on disk, computed on first write
+        self._load()
+
+    # ---------------- Index ---------------- #
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            self._urls = data.get("urls", {})
+            self._file_ids = data.get("file_ids", {})
+        except (OSError, ValueError) as e:
+            logging.warning("Could not load image index from %s: %s", self.index_path, e)
+
+    def _save(self):
+        """Schedule an index write; changes arriving before it fires share it."""
+        with self._lock:
+            if self._flush_timer is not None:
+                return
+            self._flush_timer = threading.Timer(INDEX_FLUSH_DELAY, self.flush)
+            self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def flush(self):
+        """Write index.json now (timer thread, and at exit)."""
+        with self._flush_lock:
+            with self._lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+                payload = json.dumps({"urls": self._urls, "file_ids": self._file_ids})
+            try:
+                self._write(self.index_path, payload.encode("utf-8"))
+            except OSError as e:
+                logging.warning("Could not persist image index to %s: %s", self.index_path, e)
+
+    @staticmethod
+    def _trim(entries: dict):
+        while len(entries) > MAX_INDEX_ENTRIES:
+            entries.pop(next(iter(entries)))
+
+    def sha_for(self, url: str) -> Optional[str]:
+        with self._lock:
+            return self._urls.get(url)
+
+    def file_id(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._file_ids.get(key)
+
+    def remember_file_id(self, key: str, file_id: str):
+        with self._lock:
+            self._file_ids[key] = file_id
+            self._trim(self._file_ids)
+        self._save()
+
+    def forget_file_id(self, key: str):
+        with self._lock:
+            self._file_ids.pop(key, None)
+        self._save()
+
+    # ---------------- Blobs ---------------- #
+    def path(self, sha: str, side: Optional[int] = None) -> str:
+        name = f"{sha}_{side}.jpg" if side else f"{sha}.jpg"
+        return os.path.join(self.root, sha[:2], name)
+
+    def read(self, sha: str, side: Optional[int] = None) -> Optional[bytes]:
+        path = self.path(sha, side)
+        try:
+            with open(path, "rb") as fh:
+                data = fh.read()
+            os.utime(path)  # mtime doubles as last-used time for eviction
+            return data
+        except OSError:
+            return None
+
+    def put(self, url: str, sha: str, data: bytes, side: Optional[int] = None):
+        path = self.path(sha, side)
+        if not os.path.exists(path):
+            self._write(path, data)
+            self._grow(len(data))
+        if url:
+            with self._lock:
+                self._urls[url] = sha
+                self._trim(self._urls)
+            self._save()
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+
+    def _blobs(self) -> list:
+        blobs = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith(".jpg"):
+                    full = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(full)
+                    except OSError:
+                        continue
+                    blobs.append((st.st_mtime, st.st_size, full))
+        return blobs
+
+    def _grow(self, added: int):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._blobs())
+            else:
+                self._size += added
+            if self._size <= self.max_bytes:
+                return
+            # Drop least recently used files until back under 90% of the limit
+            target = self.max_bytes * 0.9
+            for _, size, full in sorted(self._blobs()):
+                if self._size <= target:
+                    break
+                try:
+                    os.remove(full)
+                    self._size -= size
+                except OSError:
+                    pass
+            logging.info("Image cache evicted down to %.1f MB", self._size / 1024 / 1024)
+
+
+image_cache = ImageCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_MB * 1024 * 1024)
+atexit.register(image_cache.flush)
+
+
+def resize(data: bytes, side: int) -> bytes:
+    """JPEG whose longest side is at most `side`; the input unchanged without Pillow or on decode errors."""
+    try:
+        from PIL import Image
+    except ImportError:  # Pillow is optional; without it the original is sent
+        return data
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            if max(img.size) <= side and img.format == "JPEG":
+                return data
+            img = img.convert("RGB")
+            img.thumbnail((side, side))
+            out = io.BytesIO()
+            img.save(out, "JPEG", quality=JPEG_QUALITY, optimize=True)
+            return out.getvalue()
+    except Exception as e:
+        logging.warning("Could not resize product image: %s", e)
+        return data
+
+
+def _variant(sha: str, original: Optional[bytes]) -> Optional[bytes]:
+    data = image_cache.read(sha, IMAGE_MAX_SIDE)
+    if data is not None:
+        return data
+    original = original if original is not None else image_cache.read(sha)
+    if original is None:
+        return None
+    with log_stage("image_resize", bytes=len(original)):
+        data = resize(original, IMAGE_MAX_SIDE)
+    image_cache.put(None, sha, data, IMAGE_MAX_SIDE)
+    return data
+
+
+def _photo_key(sha: str) -> str:
+    return f"{sha}_{IMAGE_MAX_SIDE}"
+
+
+def _checked(response, url: str) -> Optional[bytes]:
+    content_type = response.headers.get("Content-Type", "")
+    if response.status_code != 200 or not content_type.startswith("image/"):
+        logging.warning("Product image %s not usable (%s, %s)", url, response.status_code, content_type)
+        return None
+    if len(response.content) > MAX_IMAGE_BYTES:
+        logging.warning("Product image %s too large (%s bytes)", url, len(response.content))
+        return None
+    return response.content
+
+
+def _usable_url(image_url: Optional[str]) -> bool:
+    return bool(image_url) and image_url.startswith("http")
+
+
+def telegram_photo(image_url: Optional[str], deadline=None) -> Optional[dict]:
+    """
+    The `photo` for a sendPhoto call: {"key", "file_id"} when Telegram already
+    has this image, {"key", "data"} with the resized JPEG otherwise, or None
+    when the product has no usable image.
+    """
+    if not _usable_url(image_url):
+        return None
+    sha = image_cache.sha_for(image_url)
+    if sha:
+        file_id = image_cache.file_id(_photo_key(sha))
+        if file_id:
+            return {"key": _photo_key(sha), "file_id": file_id}
+        data = _variant(sha, None)
+        if data is not None:
+            return {"key": _photo_key(sha), "data": data}
+
+    try:
+        with log_stage("image_fetch") as stage:
+            response = request_within("GET", image_url, deadline, IMAGE_FETCH_TIMEOUT, headers=IMAGE_HEADERS)
+            stage["status_code"] = response.status_code
+        original = _checked(response, image_url)
+    except Exception as e:
+        logging.warning("Product image fetch failed for %s: %s", image_url, e)
+        return None
+    if original is None:
+        return None
+
+    sha = hashlib.sha256(original).hexdigest()
+    image_cache.put(image_url, sha, original)
+    file_id = image_cache.file_id(_photo_key(sha))  # same image under another URL
+    if file_id:
+        return {"key": _photo_key(sha), "file_id": file_id}
+    return {"key": _photo_key(sha), "data": _variant(sha, original)}
+
+
+async def telegram_photo_async(image_url: Optional[str], deadline=None) -> Optional[dict]:
+    """
+    Async variant of telegram_photo; disk and Pillow work run in a thread.
+    """
+    if not _usable_url(image_url):
+        return None
+    sha = image_cache.sha_for(image_url)
+    if sha:
+        file_id = image_cache.file_id(_photo_key(sha))
+        if file_id:
+            return {"key": _photo_key(sha), "file_id": file_id}
+        data = await asyncio.to_thread(_variant, sha, None)
+        if data is not None:
+            return {"key": _photo_key(sha), "data": data}
+
+    try:
+        with log_stage("image_fetch") as stage:
+            response = await arequest_within(
+                get_async_client(), "GET", image_url, deadline, IMAGE_FETCH_TIMEOUT,
+                headers=IMAGE_HEADERS, follow_redirects=True)
+            stage["status_code"] = response.status_code
+        original = _checked(response, image_url)
+    except Exception as e:
+        logging.warning("Product image fetch failed for %s: %s", image_url, e)
+        return None
+    if original is None:
+        return None
+
+    sha = hashlib.sha256(original).hexdigest()
+    await asyncio.to_thread(image_cache.put, image_url, sha, original)
+    file_id = image_cache.file_id(_photo_key(sha))
+    if file_id:
+        return {"key": _photo_key(sha), "file_id": file_id}
+    return {"key": _photo_key(sha), "data": await asyncio.to_thread(_variant, sha, original)}
+
+
+def remember_upload(photo: dict, telegram_json: dict):
+    """Store the file_id Telegram assigned to an uploaded photo (largest size)."""
+    if photo.get("file_id"):
+        return
+    try:
+        sizes = telegram_json["result"]["photo"]
+        image_cache.remember_file_id(photo["key"], sizes[-1]["file_id"])
+    except (KeyError, IndexError, TypeError):
+        logging.warning("Telegram response carried no photo file_id")
+
+
+def forget_upload(photo: dict):
+    """Drop a file_id Telegram rejected so the next post uploads again."""
+    if photo.get("file_id"):
+        image_cache.forget_file_id(photo["key"])
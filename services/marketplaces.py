@@ -0,0 +1,117 @@
+# services/marketplaces.py
+import re
+from typing import Optional
+from urllib.parse import urlparse
+
+# Per-marketplace presets: browser context settings, number formats and
+# selector overrides (tried before the scraper's default chain).
+MARKETPLACES = {
+    "in": {
+        "domain": "amazon.in",
+        "locale": "en-IN",
+        "timezone_id": "Asia/Kolkata",
+        "accept_language": "en-IN,en;q=0.9",
+        "currency": "INR",
+        "decimal_sep": ".",
+        "selectors": {},
+    },
+    "com": {
+        "domain": "amazon.com",
+        "locale": "en-US",
+        "timezone_id": "America/New_York",
+        "accept_language": "en-US,en;q=0.9",
+        "currency": "USD",
+        "decimal_sep": ".",
+        "selectors": {
+            "price": ["#corePrice_feature_div .a-price .a-offscreen", "#apex_desktop .a-price .a-offscreen"],
+            "discount": ["#corePriceDisplay_desktop_feature_div .savingsPercentage"],
+        },
+    },
+    "co.uk": {
+        "domain": "amazon.co.uk",
+        "locale": "en-GB",
+        "timezone_id": "Europe/London",
+        "accept_language": "en-GB,en;q=0.9",
+        "currency": "GBP",
+        "decimal_sep": ".",
+        "selectors": {
+            "price": ["#corePrice_feature_div .a-price .a-offscreen"],
+        },
+    },
+    "de": {
+        "domain": "amazon.de",
+        "locale": "de-DE",
+        "timezone_id": "Europe/Berlin",
+        "accept_language": "de-DE,de;q=0.9,en;q=0.5",
+        "currency": "EUR",
+        "decimal_sep": ",",
+        "selectors": {
+            "price": ["#corePrice_feature_div .a-price .a-offscreen"],
+            "shipping": ["#mir-layout-DELIVERY_BLOCK-slot-PRIMARY_DELIVERY_MESSAGE_LARGE"],
+        },
+    },
+}
+
+DEFAULT_MARKETPLACE = "in"
+
+_DOMAINS = [(m["domain"], key) for key, m in MARKETPLACES.items()]
+
+
+def detect_marketplace(url: str, default: str = DEFAULT_MARKETPLACE) -> str:
+    """
+    Marketplace key ("in", "com", "co.uk", "de") for an expanded Amazon URL.
+    Unknown hosts (amzn.to short links, local fixtures) fall back to `default`.
+    """
+    host = (urlparse(url).hostname or "").lower()
+    for domain, key in _DOMAINS:
+        if host == domain or host.endswith("." + domain):
+            return key
+    return default
+
+
+def get_marketplace(key: str) -> dict:
+    return MARKETPLACES.get(key) or MARKETPLACES[DEFAULT_MARKETPLACE]
+
+
+def selectors_for(key: str, field: str, default: list) -> list:
+    """Marketplace overrides first, then the default chain (deduplicated)."""
+    overrides = get_marketplace(key)["selectors"].get(field)
+    if not overrides:
+        return default
+    return overrides + [sel for sel in default if sel not in overrides]
+
+
+def _to_number(text: str, decimal_sep: str) -> Optional[float]:
+    match = re.search(r"\d[\d.,\s  ]*", text or "")
+    if not match:
+        return None
+    digits = re.sub(r"[\s  ]", "", match.group(0)).rstrip(".,")
+    thousands_sep = "." if decimal_sep == "," else ","
+    digits = digits.replace(thousands_sep, "").replace(decimal_sep, ".")
+    try:
+        return float(digits)
+    except ValueError:
+        return None
+
+
+def parse_price(text: str, key: str) -> Optional[float]:
+    """
+    "₹1,499.00" -> 1499.0, "$24.99" -> 24.99, "1.299,00 €" -> 1299.0
+    """
+    return _to_number(text, get_marketplace(key)["decimal_sep"])
+
+
+def parse_rating(text: str, key: str) -> Optional[float]:
+    """
+    "4.1 out of 5 stars" -> 4.1, "4,5 von 5 Sternen" -> 4.5
+    """
+    value = _to_number((text or "").split(" ")[0], get_marketplace(key)["decimal_sep"])
+    return value if value is not None and 0 <= value <= 5 else None
+
+
+def parse_percent(text: str) -> Optional[int]:
+    """
+    "-70%" -> 70, "₹3,096.00 (53%)" -> 53
+    """
+    match = re.search(r"(\d{1,3})\s?%", text or "")
+    return int(match.group(1)) if match else None
@@ -1,38 +1,108 @@
 # services/playwright_amazon_service.py
+from __future__ import annotations
+
+import asyncio
 import logging
 import re
 import time
-from typing import Optional, Dict, Any
-from playwright.sync_api import sync_playwright, Playwright, Browser, BrowserContext, TimeoutError as PWTimeout
+from typing import TYPE_CHECKING, Optional, Dict, Any
 import atexit
+import threading
+from config import CONTEXT_MAX_USES, CONTEXT_POOL_SIZE, SESSION_SAVE_EVERY, SESSION_WARMUP, WARM_MARKETPLACES
+from utils.deadline import DeadlineExceeded, out_of_time, timeout_ms_for
+from utils.logger import log_stage
+from services.marketplaces import DEFAULT_MARKETPLACE, detect_marketplace, get_marketplace, parse_price, selectors_for
+from services.selector_stats import selector_stats
+from services.session_profiles import CAPTCHA_SELECTOR, session_profiles
+
+# Playwright itself is imported on first use (start/astart), so importing
+# this module - and the routes that use it - doesn't pay for the driver
+if TYPE_CHECKING:
+    from playwright.sync_api import Playwright, Browser, BrowserContext
+    from playwright.async_api import (
+        Playwright as AsyncPlaywright,
+        Browser as AsyncBrowser,
+        BrowserContext as AsyncBrowserContext,
+    )
 
 # Configurable defaults (tune via environment/config.py if you want)
 DEFAULT_WAIT = 8000  # ms
 NAV_TIMEOUT = 15000  # ms
 
+DEFAULT_CHROMIUM_ARGS = [
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-setuid-sandbox",
+    "--disable-extensions",
+    "--disable-gpu"
+]
+
+SCRAPER_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/127.0.0.1 Safari/537.36"
+)
+
+CONSENT_SELECTOR = "button#sp-cc-accept, #sp-cc-accept, button[aria-label='Accept']"
+WARMUP_TIMEOUT = 8000  # ms
+CONSENT_TIMEOUT = 1500  # ms for the consent click
+LOOKUP_TIMEOUT = 1000  # ms per selector in a field's fallback chain
+
 class BrowserManager:
     """
     Singleton manager that starts Playwright + one persistent Browser.
-    Creates new BrowserContext per request for isolation.
+    Hands out isolated BrowserContexts (incognito-like sessions).
+
+    The sync methods (start/stop/new_context) back the Flask app; the
+    async ones (astart/astop/anew_context) drive a separate browser through
+    Playwright's async API for the ASGI app, where every in-flight scrape
+    is a coroutine on the event loop instead of a blocked thread.
+
+    Scrapes borrow contexts from per-marketplace pools (acquire_context /
+    release_context) preconfigured with that marketplace's locale, timezone
+    and Accept-Language, so switching markets doesn't cold-start a context.
+    A context is recycled after CONTEXT_MAX_USES scrapes.
+
+    Each new context is assigned a session profile slot and starts from its
+    saved storage state (services/session_profiles.py); the state is written
+    back after the first clean use and every SESSION_SAVE_EVERY uses. A
+    context released as blocked (captcha) is closed and its profile rotated.
+    A slot without a saved profile visits the home page once, when its
+    context is first acquired (sync Playwright can only be driven from the
+    thread that started it, so this can't move to a background thread); the
+    async pools are warmed by a background task instead.
     """
     _playwright: Optional[Playwright] = None
     _browser: Optional[Browser] = None
     _started = False
+    _pools: Dict[str, list] = {}
+    _pool_lock = threading.Lock()
+    _context_uses: Dict[int, int] = {}
+    _context_slots: Dict[int, int] = {}
+    _warmed: set = set()  # ids of sync contexts that had their warm-up chance
+
+    _async_playwright: Optional[AsyncPlaywright] = None
+    _async_browser: Optional[AsyncBrowser] = None
+    _async_lock: Optional[asyncio.Lock] = None
+    _async_pools: Dict[str, list] = {}
+    _async_context_uses: Dict[int, int] = {}  # kept apart from the sync pool's bookkeeping
+    _async_context_slots: Dict[int, int] = {}
 
     @classmethod
     def start(cls, headless: bool = True, chromium_args: list = None):
         if cls._started:
             return
-        chromium_args = chromium_args or [
-            "--no-sandbox",
-            "--disable-dev-shm-usage",
-            "--disable-setuid-sandbox",
-            "--disable-extensions",
-            "--disable-gpu"
-        ]
+        chromium_args = chromium_args or DEFAULT_CHROMIUM_ARGS
         logging.info("Starting Playwright browser (headless=%s)...", headless)
+        from playwright.sync_api import sync_playwright
         cls._playwright = sync_playwright().start()
-        cls._browser = cls._playwright.chromium.launch(headless=headless, args=chromium_args)
+        try:
+            cls._browser = cls._playwright.chromium.launch(headless=headless, args=chromium_args)
+        except Exception:
+            # Don't leave the driver running: a later start() would fail with a misleading error
+            cls._playwright.stop()
+            cls._playwright = None
+            raise
         cls._started = True
         # Ensure cleanup at process exit
         atexit.register(cls.stop)
@@ -51,19 +121,273 @@ class BrowserManager:
             cls._browser = None
             cls._playwright = None
             cls._started = False
+            with cls._pool_lock:
+                cls._pools = {}
+                cls._context_uses = {}
+                cls._context_slots = {}
+                cls._warmed = set()
 
     @classmethod
-    def new_context(cls, *, user_agent: Optional[str] = None, locale: Optional[str] = "en-IN") -> BrowserContext:
+    def new_context(cls, *, user_agent: Optional[str] = None, locale: Optional[str] = "en-IN", **options) -> BrowserContext:
         if not cls._started or not cls._browser:
             # default start with headless True
             cls.start(headless=True)
-        context_args = {}
-        if user_agent:
-            context_args["user_agent"] = user_agent
-        if locale:
-            context_args["locale"] = locale
         # create an isolated context (like an incognito session)
-        return cls._browser.new_context(**context_args)
+        return cls._browser.new_context(**_context_args(user_agent, locale, **options))
+
+    @classmethod
+    def acquire_context(cls, marketplace: str = DEFAULT_MARKETPLACE, deadline=None) -> BrowserContext:
+        """Borrow a warm context for `marketplace`; creates one if the pool is empty."""
+        with cls._pool_lock:
+            pool = cls._pools.get(marketplace)
+            context = pool.pop() if pool else None
+        if context is None:
+            context = cls._new_pool_context(marketplace)
+        cls._warm_once(marketplace, context, deadline)
+        return context
+
+    @classmethod
+    def _new_pool_context(cls, marketplace: str) -> BrowserContext:
+        slot = session_profiles.next_slot(marketplace)
+        context = cls.new_context(**_marketplace_context_args(marketplace, slot))
+        with cls._pool_lock:
+            cls._context_slots[id(context)] = slot
+        return context
+
+    @classmethod
+    def _warm_once(cls, marketplace: str, context: BrowserContext, deadline=None):
+        """First acquire of a context whose slot has no saved profile: one bounded home-page visit."""
+        with cls._pool_lock:
+            if id(context) in cls._warmed:
+                return
+            cls._warmed.add(id(context))
+            slot = cls._context_slots.get(id(context))
+        if not SESSION_WARMUP or slot is None or session_profiles.storage_state(marketplace, slot) is not None:
+            return
+        if not out_of_time(deadline):
+            _warm_up(context, marketplace, deadline)
+
+    @classmethod
+    def release_context(cls, marketplace: str, context: BrowserContext, discard: bool = False, blocked: bool = False):
+        """Return a borrowed context; closes it when discarded, blocked, worn out or the pool is full."""
+        with cls._pool_lock:
+            uses = cls._context_uses.get(id(context), 0) + 1
+            slot = cls._context_slots.get(id(context))
+        if blocked:
+            discard = True
+            if slot is not None:
+                session_profiles.rotate(marketplace, slot)
+        elif not discard and slot is not None and _should_save(uses):
+            try:
+                session_profiles.save(marketplace, slot, context.storage_state())
+            except Exception as e:
+                logging.warning("Could not save session profile for %s: %s", marketplace, e)
+
+        with cls._pool_lock:
+            pool = cls._pools.setdefault(marketplace, [])
+            keep = not discard and uses < CONTEXT_MAX_USES and len(pool) < CONTEXT_POOL_SIZE and cls._started
+            if keep:
+                cls._context_uses[id(context)] = uses
+                pool.append(context)
+                return
+            cls._context_uses.pop(id(context), None)
+            cls._context_slots.pop(id(context), None)
+            cls._warmed.discard(id(context))
+        try:
+            context.close()
+        except Exception:
+            pass
+
+    @classmethod
+    def warm_pools(cls, marketplaces: list = None, size: int = None):
+        """
+        Pre-create contexts so the first scrape per marketplace skips context startup.
+        Their home-page warm-up is left to the first acquire (see _warm_once).
+        """
+        size = CONTEXT_POOL_SIZE if size is None else size
+        for marketplace in marketplaces or WARM_MARKETPLACES:
+            with cls._pool_lock:
+                missing = size - len(cls._pools.get(marketplace, []))
+            for _ in range(missing):
+                context = cls._new_pool_context(marketplace)
+                with cls._pool_lock:
+                    cls._pools.setdefault(marketplace, []).append(context)
+            logging.info("Created %s Playwright context(s) for marketplace %s", size, marketplace)
+
+    @classmethod
+    async def astart(cls, headless: bool = True, chromium_args: list = None):
+        if cls._async_lock is None:
+            cls._async_lock = asyncio.Lock()
+        async with cls._async_lock:
+            if cls._async_browser:
+                return
+            chromium_args = chromium_args or DEFAULT_CHROMIUM_ARGS
+            logging.info("Starting async Playwright browser (headless=%s)...", headless)
+            from playwright.async_api import async_playwright
+            pw = await async_playwright().start()
+            try:
+                cls._async_browser = await pw.chromium.launch(headless=headless, args=chromium_args)
+            except Exception:
+                await pw.stop()
+                raise
+            cls._async_playwright = pw
+
+    @classmethod
+    async def astop(cls):
+        try:
+            if cls._async_browser:
+                logging.info("Closing async Playwright browser...")
+                await cls._async_browser.close()
+            if cls._async_playwright:
+                await cls._async_playwright.stop()
+        except Exception as e:
+            logging.warning("Error shutting down async Playwright: %s", e)
+        finally:
+            cls._async_browser = None
+            cls._async_playwright = None
+            cls._async_lock = None
+            cls._async_pools = {}
+            cls._async_context_uses = {}
+            cls._async_context_slots = {}
+
+    @classmethod
+    async def anew_context(cls, *, user_agent: Optional[str] = None, locale: Optional[str] = "en-IN", **options) -> AsyncBrowserContext:
+        if not cls._async_browser:
+            await cls.astart(headless=True)
+        return await cls._async_browser.new_context(**_context_args(user_agent, locale, **options))
+
+    @classmethod
+    async def aacquire_context(cls, marketplace: str = DEFAULT_MARKETPLACE) -> AsyncBrowserContext:
+        pool = cls._async_pools.get(marketplace)
+        if pool:
+            return pool.pop()
+        slot = session_profiles.next_slot(marketplace)
+        context = await cls.anew_context(**_marketplace_context_args(marketplace, slot))
+        cls._async_context_slots[id(context)] = slot
+        return context
+
+    @classmethod
+    async def arelease_context(cls, marketplace: str, context: AsyncBrowserContext, discard: bool = False, blocked: bool = False):
+        uses = cls._async_context_uses.get(id(context), 0) + 1
+        slot = cls._async_context_slots.get(id(context))
+        if blocked:
+            discard = True
+            if slot is not None:
+                session_profiles.rotate(marketplace, slot)
+        elif not discard and slot is not None and _should_save(uses):
+            try:
+                session_profiles.save(marketplace, slot, await context.storage_state())
+            except Exception as e:
+                logging.warning("Could not save session profile for %s: %s", marketplace, e)
+
+        pool = cls._async_pools.setdefault(marketplace, [])
+        if not discard and uses < CONTEXT_MAX_USES and len(pool) < CONTEXT_POOL_SIZE and cls._async_browser:
+            cls._async_context_uses[id(context)] = uses
+            pool.append(context)
+            return
+        cls._async_context_uses.pop(id(context), None)
+        cls._async_context_slots.pop(id(context), None)
+        try:
+            await context.close()
+        except Exception:
+            pass
+
+    @classmethod
+    async def awarm_pools(cls, marketplaces: list = None, size: int = None):
+        size = CONTEXT_POOL_SIZE if size is None else size
+        for marketplace in marketplaces or WARM_MARKETPLACES:
+            missing = size - len(cls._async_pools.get(marketplace, []))
+            slots = [session_profiles.next_slot(marketplace) for _ in range(missing)]
+            contexts = await asyncio.gather(*[
+                cls.anew_context(**_marketplace_context_args(marketplace, slot)) for slot in slots
+            ])
+            for slot, context in zip(slots, contexts):
+                cls._async_context_slots[id(context)] = slot
+            if SESSION_WARMUP:
+                await asyncio.gather(*[
+                    _awarm_up(context, marketplace) for slot, context in zip(slots, contexts)
+                    if session_profiles.storage_state(marketplace, slot) is None
+                ])
+            for context in contexts:
+                await cls.arelease_context(marketplace, context)
+            logging.info("Warmed %s async Playwright context(s) for marketplace %s", size, marketplace)
+
+
+def _context_args(user_agent: Optional[str], locale: Optional[str], **options) -> Dict[str, Any]:
+    context_args = {k: v for k, v in options.items() if v is not None}
+    if user_agent:
+        context_args["user_agent"] = user_agent
+    if locale:
+        context_args["locale"] = locale
+    return context_args
+
+
+def _marketplace_context_args(marketplace: str, slot: Optional[int] = None) -> Dict[str, Any]:
+    preset = get_marketplace(marketplace)
+    return {
+        "user_agent": SCRAPER_USER_AGENT,
+        "locale": preset["locale"],
+        "timezone_id": preset["timezone_id"],
+        "extra_http_headers": {"Accept-Language": preset["accept_language"]},
+        "storage_state": session_profiles.storage_state(marketplace, slot) if slot is not None else None,
+    }
+
+
+def _should_save(uses: int) -> bool:
+    return uses == 1 or uses % SESSION_SAVE_EVERY == 0
+
+
+def _home_url(marketplace: str) -> str:
+    return f"https://www.{get_marketplace(marketplace)['domain']}/"
+
+
+def _dismiss_consent(page, deadline=None):
+    # is_visible() doesn't wait, so pages without a banner (the usual case
+    # with a stored session) cost one round-trip instead of a click timeout;
+    # the click is skipped once the deadline has passed
+    try:
+        consent = page.locator(CONSENT_SELECTOR).first
+        if consent.is_visible():
+            consent.click(timeout=timeout_ms_for(deadline, CONSENT_TIMEOUT))
+    except Exception:
+        pass
+
+
+async def _adismiss_consent(page, deadline=None):
+    try:
+        consent = page.locator(CONSENT_SELECTOR).first
+        if await consent.is_visible():
+            await consent.click(timeout=timeout_ms_for(deadline, CONSENT_TIMEOUT))
+    except Exception:
+        pass
+
+
+def _warm_up(context, marketplace: str, deadline=None):
+    """Visit the marketplace home page once so the context collects session and consent cookies."""
+    try:
+        page = context.new_page()
+        try:
+            with log_stage("session_warmup", marketplace=marketplace):
+                page.goto(_home_url(marketplace), wait_until="domcontentloaded",
+                          timeout=timeout_ms_for(deadline, WARMUP_TIMEOUT))
+                _dismiss_consent(page, deadline)
+        finally:
+            page.close()
+    except Exception as e:
+        logging.warning("Session warm-up for %s failed: %s", marketplace, e)
+
+
+async def _awarm_up(context, marketplace: str):
+    try:
+        page = await context.new_page()
+        try:
+            with log_stage("session_warmup", marketplace=marketplace):
+                await page.goto(_home_url(marketplace), wait_until="domcontentloaded", timeout=WARMUP_TIMEOUT)
+                await _adismiss_consent(page)
+        finally:
+            await page.close()
+    except Exception as e:
+        logging.warning("Session warm-up for %s failed: %s", marketplace, e)
 
 
 # Helper: lightweight selectors + parsing utilities
@@ -75,227 +399,467 @@ def _text_or_none(locator) -> Optional[str]:
         return None
 
 
-def expand_amazon_url(short_url: str) -> str:
+# Fallback selector chains per field, tried in order until one yields a value
+TEXT_SELECTORS = {
+    "title": ["#productTitle", "#title", "h1.a-size-large"],
+    # Price may appear in multiple places
+    "price": [
+        ".a-price .a-offscreen",
+        "#priceblock_ourprice",
+        "#priceblock_dealprice",
+        "#tp_price_block_total_price_ww"
+    ],
+    "deal_price": ["#priceblock_dealprice", ".a-price .a-offscreen"],
+    "discount": [
+        ".savingsPercentage",
+        "#regularprice_savings .a-size-medium.a-color-price",
+        "#priceblock_savings .a-offscreen"
+    ],
+    "rating": ["i.a-icon-star span.a-icon-alt", "#acrPopover", ".averageStarRating"],
+    "review_count": ["#acrCustomerReviewText", "#acrCustomerReviewLink"],
+    "availability": ["#availability .a-declarative", "#availability span", "#availability_feature_div span"],
+    "description": ["#productDescription", "#feature-bullets"],
+    "asin": ["#ASIN", "input[name='ASIN']"],
+    "brand": ["#bylineInfo", "#brand", ".a-size-base.a-color-secondary"],
+    "seller": ["#merchant-info", "#sellerProfileTriggerId"],
+    "warranty": ["#productWarranty_feature_div", "#warranty"],
+    "shipping": ["#ourprice_shippingmessage", "#deliveryMessageMirId"],
+    "offer": ["#dealBadgePrimaryText"],
+    "prime": [".a-icon-prime", "#primeExclusiveBadge_feature_div"],
+    "color": ["#variation_color_name .selection"],
+    "size": ["#variation_size_name .selection"],
+    "manufacturer": ["#bylineInfo_feature_div", "#productDetails_techSpec_section_1"],
+}
+
+ATTR_SELECTORS = {
+    "image_hires": (["#landingImage", "#imgTagWrapperId img"], "data-old-hires"),
+    "image": (["#landingImage", "#imgTagWrapperId img", ".imgTagWrapper img"], "src"),
+    "reviews_link": (["#reviews-medley-footer a", "#seeAllReviews"], "href"),
+}
+
+LIST_SELECTORS = {
+    "bullet_points": ["#feature-bullets ul li span", "#productDescription ul li", "#productDescription p"],
+    "category": ["#wayfinding-breadcrumbs_feature_div li a", "#wayfinding-breadcrumbs_container li a"],
+    # Best seller rank and dimensions often live in the details table; fetch whole table text and parse
+    "details": ["#productDetails_detailBullets_sections1 tr", "#productDetails_techSpec_section_1 tr", "#detailBullets_feature_div li"],
+}
+
+# Fields only worth a lookup when the field they back up came back empty
+FALLBACK_FOR = {"description": "bullet_points", "image": "image_hires"}
+
+
+# Chains whose selectors are alternative markups of the same element. In
+# every other chain the order is a precedence (the deal price before the
+# generic price, #bylineInfo before the secondary text), so a generic
+# selector that hits more often must not move ahead of a specific one.
+INTERCHANGEABLE_FIELDS = {"title", "asin", "category"}
+
+
+# Every miss in a chain can cost a full locator timeout, so interchangeable
+# chains try the selector with the best recent hit rate first (see
+# services/selector_stats.py); the others keep their order and are only recorded.
+def _ordered(field: Optional[str], selector_list: list) -> list:
+    if field and field.rsplit(":", 1)[-1] in INTERCHANGEABLE_FIELDS:
+        return selector_stats.order(f"playwright:{field}", selector_list)
+    return selector_list
+
+
+def _record(field: Optional[str], tried: list, hit: Optional[str]):
+    if field:
+        selector_stats.record_chain(f"playwright:{field}", tried, hit)
+
+
+# Each lookup gets LOOKUP_TIMEOUT, cut to what is left of the deadline; a chain
+# stops (without recording a miss) once the deadline has passed.
+def _page_text(page, selector_list, field=None, deadline=None) -> Optional[str]:
+    selector_list = _ordered(field, selector_list)
+    for i, sel in enumerate(selector_list):
+        timeout = _budget_ms(deadline, LOOKUP_TIMEOUT)
+        if timeout is None:
+            return None
+        try:
+            txt = page.locator(sel).first.text_content(timeout=timeout)
+            if txt:
+                _record(field, selector_list[:i + 1], sel)
+                return txt.strip()
+        except Exception:
+            continue
+    _record(field, selector_list, None)
+    return None
+
+
+def _page_attr(page, selector_list, attr, field=None, deadline=None) -> Optional[str]:
+    selector_list = _ordered(field, selector_list)
+    for i, sel in enumerate(selector_list):
+        timeout = _budget_ms(deadline, LOOKUP_TIMEOUT)
+        if timeout is None:
+            return None
+        try:
+            val = page.locator(sel).first.get_attribute(attr, timeout=timeout)
+            if val:
+                _record(field, selector_list[:i + 1], sel)
+                return val.strip()
+        except Exception:
+            continue
+    _record(field, selector_list, None)
+    return None
+
+
+def _page_list(page, selector_list, field=None, deadline=None) -> list:
+    selector_list = _ordered(field, selector_list)
+    for i, sel in enumerate(selector_list):
+        out = []
+        try:
+            locs = page.locator(sel)
+            n = locs.count()
+            for j in range(n):
+                timeout = _budget_ms(deadline, LOOKUP_TIMEOUT)
+                if timeout is None:
+                    return out
+                t = locs.nth(j).text_content(timeout=timeout)
+                if t:
+                    out.append(t.strip())
+            if out:
+                _record(field, selector_list[:i + 1], sel)
+                return out
+        except Exception:
+            continue
+    _record(field, selector_list, None)
+    return []
+
+
+async def _apage_text(page, selector_list, field=None, deadline=None) -> Optional[str]:
+    selector_list = _ordered(field, selector_list)
+    for i, sel in enumerate(selector_list):
+        timeout = _budget_ms(deadline, LOOKUP_TIMEOUT)
+        if timeout is None:
+            return None
+        try:
+            txt = await page.locator(sel).first.text_content(timeout=timeout)
+            if txt:
+                _record(field, selector_list[:i + 1], sel)
+                return txt.strip()
+        except Exception:
+            continue
+    _record(field, selector_list, None)
+    return None
+
+
+async def _apage_attr(page, selector_list, attr, field=None, deadline=None) -> Optional[str]:
+    selector_list = _ordered(field, selector_list)
+    for i, sel in enumerate(selector_list):
+        timeout = _budget_ms(deadline, LOOKUP_TIMEOUT)
+        if timeout is None:
+            return None
+        try:
+            val = await page.locator(sel).first.get_attribute(attr, timeout=timeout)
+            if val:
+                _record(field, selector_list[:i + 1], sel)
+                return val.strip()
+        except Exception:
+            continue
+    _record(field, selector_list, None)
+    return None
+
+
+async def _apage_list(page, selector_list, field=None, deadline=None) -> list:
+    selector_list = _ordered(field, selector_list)
+    for i, sel in enumerate(selector_list):
+        out = []
+        try:
+            locs = page.locator(sel)
+            n = await locs.count()
+            for j in range(n):
+                timeout = _budget_ms(deadline, LOOKUP_TIMEOUT)
+                if timeout is None:
+                    return out
+                t = await locs.nth(j).text_content(timeout=timeout)
+                if t:
+                    out.append(t.strip())
+            if out:
+                _record(field, selector_list[:i + 1], sel)
+                return out
+        except Exception:
+            continue
+    _record(field, selector_list, None)
+    return []
+
+
+def _budget_ms(deadline, cap_ms: float) -> Optional[float]:
+    """Timeout for one lookup, or None once the request deadline has passed."""
+    try:
+        return timeout_ms_for(deadline, cap_ms)
+    except DeadlineExceeded:
+        return None
+
+
+# Extraction stops at the deadline and returns what it has with raw["partial"] set
+def _extract_fields(page, marketplace: str = DEFAULT_MARKETPLACE, deadline=None) -> Dict[str, Any]:
+    raw: Dict[str, Any] = {}
+    for field, selectors in LIST_SELECTORS.items():
+        if out_of_time(deadline):
+            return {**raw, "partial": True}
+        raw[field] = _page_list(page, selectors_for(marketplace, field, selectors), f"{marketplace}:{field}", deadline)
+    for field, selectors in TEXT_SELECTORS.items():
+        if not raw.get(FALLBACK_FOR.get(field)):
+            if out_of_time(deadline):
+                return {**raw, "partial": True}
+            raw[field] = _page_text(page, selectors_for(marketplace, field, selectors), f"{marketplace}:{field}", deadline)
+    for field, (selectors, attr) in ATTR_SELECTORS.items():
+        if not raw.get(FALLBACK_FOR.get(field)):
+            if out_of_time(deadline):
+                return {**raw, "partial": True}
+            raw[field] = _page_attr(page, selectors_for(marketplace, field, selectors), attr, f"{marketplace}:{field}", deadline)
+    if out_of_time(deadline):
+        raw["partial"] = True  # the last chain may have been cut short
+    return raw
+
+
+async def _aextract_fields(page, marketplace: str = DEFAULT_MARKETPLACE, deadline=None) -> Dict[str, Any]:
+    raw: Dict[str, Any] = {}
+    for field, selectors in LIST_SELECTORS.items():
+        if out_of_time(deadline):
+            return {**raw, "partial": True}
+        raw[field] = await _apage_list(page, selectors_for(marketplace, field, selectors), f"{marketplace}:{field}", deadline)
+    for field, selectors in TEXT_SELECTORS.items():
+        if not raw.get(FALLBACK_FOR.get(field)):
+            if out_of_time(deadline):
+                return {**raw, "partial": True}
+            raw[field] = await _apage_text(page, selectors_for(marketplace, field, selectors), f"{marketplace}:{field}", deadline)
+    for field, (selectors, attr) in ATTR_SELECTORS.items():
+        if not raw.get(FALLBACK_FOR.get(field)):
+            if out_of_time(deadline):
+                return {**raw, "partial": True}
+            raw[field] = await _apage_attr(page, selectors_for(marketplace, field, selectors), attr, f"{marketplace}:{field}", deadline)
+    if out_of_time(deadline):
+        raw["partial"] = True
+    return raw
+
+
+def _build_result(url: str, orgUrl: str, raw: Dict[str, Any], marketplace: str = DEFAULT_MARKETPLACE) -> Dict[str, Any]:
+    """
+    Turn raw selector hits into the product dict (same keys as the static scraper).
+    """
+    bullets = raw.get("bullet_points") or []
+    description = " ".join(bullets) if bullets else raw.get("description") or "Not Found"
+
+    asin = raw.get("asin")
+    if not asin:
+        # try from URL
+        m = re.search(r"/([A-Z0-9]{10})(?:[/?]|$)", url)
+        asin = m.group(1) if m else "Not Found"
+
+    details_text = raw.get("details") or []
+    details_blob = " | ".join(details_text)
+
+    # Extract weight/dimensions via regex on details_blob
+    dims_match = re.search(r"((Dimensions|Product Dimensions|Produktabmessungen)[^|\n]*)", details_blob, re.IGNORECASE)
+    dimensions = dims_match.group(1).strip() if dims_match else "Not Found"
+
+    weight_match = re.search(r"(\d+\.?\d*\s?(kg|g|lbs|oz))\b", details_blob, re.IGNORECASE)
+    weight = weight_match.group(1) if weight_match else "Not Found"
+
+    # Best seller rank
+    bsr_match = re.search(r"(#\d+[\d,]*)", details_blob)
+    best_sellers_rank = bsr_match.group(1) if bsr_match else "Not Found"
+
+    price = raw.get("price") or "Not Found"
+
+    result = {
+        "url": url,
+        "orgUrl": orgUrl,
+        "marketplace": marketplace,
+        "title": raw.get("title") or "Not Found",
+        "price": price,
+        "price_value": parse_price(raw.get("price"), marketplace),
+        "currency": get_marketplace(marketplace)["currency"],
+        "deal_price": raw.get("deal_price") or price,
+        "rating": raw.get("rating") or "Not Found",
+        "discount": raw.get("discount") or "Not Found",
+        "offer": raw.get("offer") or "Not Found",
+        "image": raw.get("image_hires") or raw.get("image") or "Not Found",
+        "description": description,
+        "availability": raw.get("availability") or "Not Found",
+        "prime_eligible": "Yes" if raw.get("prime") else "No",
+        "review_count": raw.get("review_count") or "Not Found",
+        "asin": asin,
+        "brand": raw.get("brand") or "Not Found",
+        "category": raw.get("category") or [],
+        "bullet_points": bullets,
+        "dimensions": dimensions,
+        "weight": weight,
+        "color": raw.get("color") or "Not Found",
+        "size": raw.get("size") or "Not Found",
+        "seller": raw.get("seller") or "Not Found",
+        "shipping": raw.get("shipping") or "Not Found",
+        "warranty": raw.get("warranty") or "Not Found",
+        "reviews_link": raw.get("reviews_link") or "Not Found",
+        "best_sellers_rank": best_sellers_rank,
+        "manufacturer": raw.get("manufacturer") or "Not Found"
+    }
+    if raw.get("partial"):
+        result["partial"] = True
+    return result
+
+
+def expand_amazon_url(short_url: str, deadline=None) -> str:
     """
     Expand amzn.to or short links using a HEAD request fallback.
     Playwright is not required for expanding; use simple requests via browser navigation as last resort.
     We'll just try a quick navigator using browser to follow redirects for reliability.
     """
     try:
-        # Use a temporary context to follow redirect faster (avoids external "requests" dependency)
-        ctx = BrowserManager.new_context()
-        page = ctx.new_page()
-        page.goto(short_url, timeout=NAV_TIMEOUT)
-        final = page.url
+        # Borrow a warm context to follow the redirect (avoids external "requests" dependency)
+        ctx = BrowserManager.acquire_context(DEFAULT_MARKETPLACE, deadline)
+        page = None
         try:
-            page.close()
-        except Exception:
-            pass
-        try:
-            ctx.close()
-        except Exception:
-            pass
-        return final
+            page = ctx.new_page()
+            with log_stage("expand_url", scraper="playwright"):
+                page.goto(short_url, timeout=timeout_ms_for(deadline, NAV_TIMEOUT))
+            final = page.url
+            try:
+                page.close()
+            except Exception:
+                pass
+            return final
+        finally:
+            # No page means the context itself is broken: don't pool it again
+            BrowserManager.release_context(DEFAULT_MARKETPLACE, ctx, discard=page is None)
     except Exception as e:
         logging.warning("expand_amazon_url via Playwright failed: %s; returning original", e)
         return short_url
 
 
-def scrape_amazon_details(url: str, orgUrl: str) -> Dict[str, Any]:
+def scrape_amazon_details(url: str, orgUrl: str, deadline=None) -> Dict[str, Any]:
     """
     Scrape Amazon product details using Playwright for dynamic content.
     Returns a dict with same keys as your previous scraper.
     """
     # Ensure browser started
     BrowserManager.start(headless=True)
+    from playwright.sync_api import TimeoutError as PWTimeout
 
-    context = BrowserManager.new_context(user_agent=(
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/127.0.0.1 Safari/537.36"
-    ))
-    page = context.new_page()
-    page.set_default_navigation_timeout(NAV_TIMEOUT)
-    page.set_default_timeout(DEFAULT_WAIT)
-
+    marketplace = detect_marketplace(url)
+    context = BrowserManager.acquire_context(marketplace, deadline)
+    discard = blocked = False
+    page = None
     try:
-        logging.info("Playwright loading URL: %s", url)
+        page = context.new_page()
+        page.set_default_navigation_timeout(timeout_ms_for(deadline, NAV_TIMEOUT))
+        page.set_default_timeout(timeout_ms_for(deadline, DEFAULT_WAIT))
+        logging.debug("Playwright loading URL: %s", url)
         # Navigate and wait for key selectors that typically indicate product content
-        page.goto(url, wait_until="domcontentloaded")
+        with log_stage("amazon_fetch", scraper="playwright"):
+            page.goto(url, wait_until="domcontentloaded")
 
-        # Wait for either product title or a common container (adjustable)
-        try:
-            page.wait_for_selector("#productTitle, #title, #dp", timeout=10000)
-        except PWTimeout:
-            logging.info("Primary selectors not found quickly; continuing anyway.")
+            # Wait for either product title or a common container (adjustable);
+            # the captcha form is in the list so a bot check returns immediately
+            try:
+                page.wait_for_selector(f"#productTitle, #title, #dp, {CAPTCHA_SELECTOR}", timeout=timeout_ms_for(deadline, 10000))
+            except PWTimeout:
+                logging.info("Primary selectors not found quickly; continuing anyway.")
+
+        if page.locator(CAPTCHA_SELECTOR).count():
+            logging.warning("Amazon bot check for url %s (marketplace %s)", url, marketplace)
+            blocked = True
+            return {"error": "Blocked by Amazon bot check (captcha)", "captcha": True}
 
         # Remove potential overlay/cookie banners that block content
-        try:
-            page.locator("button#sp-cc-accept, #sp-cc-accept, button[aria-label='Accept']").first.click(timeout=1500)
-        except Exception:
-            pass
+        _dismiss_consent(page, deadline)
 
         # Extract dynamically using robust locators
-        def _get(selector_list):
-            for sel in selector_list:
-                try:
-                    el = page.locator(sel).first
-                    txt = el.text_content(timeout=1000)
-                    if txt:
-                        return txt.strip()
-                except Exception:
-                    continue
-            return None
-
-        def _get_attr(selector_list, attr):
-            for sel in selector_list:
-                try:
-                    el = page.locator(sel).first
-                    val = el.get_attribute(attr)
-                    if val:
-                        return val.strip()
-                except Exception:
-                    continue
-            return None
-
-        def _get_list(selector_list):
-            out = []
-            for sel in selector_list:
-                try:
-                    locs = page.locator(sel)
-                    n = locs.count()
-                    for i in range(n):
-                        t = locs.nth(i).text_content()
-                        if t:
-                            out.append(t.strip())
-                    if out:
-                        return out
-                except Exception:
-                    continue
-            return []
-
-        title = _get(["#productTitle", "#title", "h1.a-size-large"]) or "Not Found"
-
-        # Price may appear in multiple places
-        price = _get([
-            ".a-price .a-offscreen",
-            "#priceblock_ourprice",
-            "#priceblock_dealprice",
-            "#tp_price_block_total_price_ww"
-        ]) or "Not Found"
-
-        deal_price = _get([
-            "#priceblock_dealprice",
-            ".a-price .a-offscreen"
-        ]) or price
-
-        discount = _get([
-            ".savingsPercentage",
-            "#regularprice_savings .a-size-medium.a-color-price",
-            "#priceblock_savings .a-offscreen"
-        ]) or "Not Found"
-
-        rating = _get([
-            "i.a-icon-star span.a-icon-alt",
-            "#acrPopover",
-            ".averageStarRating"
-        ]) or "Not Found"
-
-        review_count = _get([
-            "#acrCustomerReviewText",
-            "#acrCustomerReviewLink"
-        ]) or "Not Found"
-
-        image = _get_attr([
-            "#landingImage",
-            "#imgTagWrapperId img",
-            ".imgTagWrapper img"
-        ], "src") or _get_attr(["#imgTagWrapperId img"], "data-old-hires") or "Not Found"
-
-        availability = _get([
-            "#availability .a-declarative",
-            "#availability span",
-            "#availability_feature_div span"
-        ]) or "Not Found"
-
-        bullets = _get_list(["#feature-bullets ul li span", "#productDescription ul li", "#productDescription p"])
-        description = " ".join(bullets) if bullets else _get(["#productDescription", "#feature-bullets"]) or "Not Found"
-
-        asin = _get(["#ASIN", "input[name='ASIN']"]) or None
-        if not asin:
-            # try from URL
-            m = re.search(r"/([A-Z0-9]{10})(?:[/?]|$)", url)
-            if m:
-                asin = m.group(1)
-            else:
-                asin = "Not Found"
-
-        brand = _get(["#bylineInfo", "#brand", ".a-size-base.a-color-secondary"]) or "Not Found"
-
-        category = _get_list(["#wayfinding-breadcrumbs_feature_div li a", "#wayfinding-breadcrumbs_container li a"]) or []
-
-        # Best seller rank and dimensions often live in the details table; fetch whole table text and parse
-        details_text = _get_list(["#productDetails_detailBullets_sections1 tr", "#productDetails_techSpec_section_1 tr", "#detailBullets_feature_div li"])
-        details_blob = " | ".join(details_text) if details_text else ""
-
-        # Extract weight/dimensions via regex on details_blob
-        dims_match = re.search(r"((Dimensions|Product Dimensions)[^|\\n]*)", details_blob, re.IGNORECASE)
-        dimensions = dims_match.group(1).strip() if dims_match else "Not Found"
-
-        weight_match = re.search(r"(\\d+\\.?\\d*\\s?(kg|g|lbs|oz))", details_blob, re.IGNORECASE)
-        weight = weight_match.group(1) if weight_match else "Not Found"
-
-        # Best seller rank
-        bsr_match = re.search(r"(#\\d+[\\d,]*)", details_blob)
-        best_sellers_rank = bsr_match.group(1) if bsr_match else "Not Found"
-
-        seller = _get(["#merchant-info", "#sellerProfileTriggerId"]) or "Not Found"
-        warranty = _get(["#productWarranty_feature_div", "#warranty"]) or "Not Found"
-        shipping = _get(["#ourprice_shippingmessage", "#deliveryMessageMirId"]) or "Not Found"
-
-        # Build result - same keys as previous scraper
-        result = {
-            "url": url,
-            "orgUrl": orgUrl,
-            "title": title,
-            "price": price,
-            "deal_price": deal_price,
-            "rating": rating,
-            "discount": discount,
-            "offer": _get(["#dealBadgePrimaryText"]) or "Not Found",
-            "image": image,
-            "description": description,
-            "availability": availability,
-            "prime_eligible": "Yes" if _get([".a-icon-prime", "#primeExclusiveBadge_feature_div"]) else "No",
-            "review_count": review_count,
-            "asin": asin,
-            "brand": brand,
-            "category": category,
-            "bullet_points": bullets or [],
-            "dimensions": dimensions,
-            "weight": weight,
-            "color": _get(["#variation_color_name .selection"]) or "Not Found",
-            "size": _get(["#variation_size_name .selection"]) or "Not Found",
-            "seller": seller,
-            "shipping": shipping,
-            "warranty": warranty,
-            "reviews_link": _get_attr(["#reviews-medley-footer a", "#seeAllReviews"], "href") or "Not Found",
-            "best_sellers_rank": best_sellers_rank,
-            "manufacturer": _get(["#bylineInfo_feature_div", "#productDetails_techSpec_section_1"]) or "Not Found"
-        }
-
-        return result
+        with log_stage("amazon_extract", scraper="playwright"):
+            raw = _extract_fields(page, marketplace, deadline)
+        return _build_result(url, orgUrl, raw, marketplace)
 
+    except (PWTimeout, DeadlineExceeded) as exc:
+        # Expected under load / layout drift - no traceback needed
+        logging.warning("Playwright timeout for url %s: %s", url, exc)
+        return {"error": str(exc)}
     except Exception as exc:
         logging.exception("Playwright scraping error for url %s: %s", url, exc)
+        discard = True  # don't hand a possibly broken context to the next request
         return {"error": str(exc)}
     finally:
+        if page is None:
+            discard = True  # new_page() failed: the context is broken
+        else:
+            try:
+                page.close()
+            except Exception:
+                pass
+        BrowserManager.release_context(marketplace, context, discard=discard, blocked=blocked)
+
+
+async def expand_amazon_url_async(short_url: str, deadline=None) -> str:
+    """
+    Async variant of expand_amazon_url (ASGI mode).
+    """
+    try:
+        ctx = await BrowserManager.aacquire_context(DEFAULT_MARKETPLACE)
+        page = None
         try:
-            page.close()
-        except Exception:
-            pass
-        try:
-            context.close()
-        except Exception:
-            pass
+            page = await ctx.new_page()
+            with log_stage("expand_url", scraper="playwright"):
+                await page.goto(short_url, timeout=timeout_ms_for(deadline, NAV_TIMEOUT))
+            final = page.url
+            try:
+                await page.close()
+            except Exception:
+                pass
+            return final
+        finally:
+            await BrowserManager.arelease_context(DEFAULT_MARKETPLACE, ctx, discard=page is None)
+    except Exception as e:
+        logging.warning("expand_amazon_url via Playwright failed: %s; returning original", e)
+        return short_url
+
 
+async def scrape_amazon_details_async(url: str, orgUrl: str, deadline=None) -> Dict[str, Any]:
+    """
+    Async variant of scrape_amazon_details (ASGI mode); same keys and error contract.
+    """
+    from playwright.async_api import TimeoutError as PWTimeout
+    marketplace = detect_marketplace(url)
+    context = await BrowserManager.aacquire_context(marketplace)
+    discard = blocked = False
+    page = None
+    try:
+        page = await context.new_page()
+        page.set_default_navigation_timeout(timeout_ms_for(deadline, NAV_TIMEOUT))
+        page.set_default_timeout(timeout_ms_for(deadline, DEFAULT_WAIT))
+        logging.debug("Playwright loading URL: %s", url)
+        with log_stage("amazon_fetch", scraper="playwright"):
+            await page.goto(url, wait_until="domcontentloaded")
+            try:
+                await page.wait_for_selector(f"#productTitle, #title, #dp, {CAPTCHA_SELECTOR}", timeout=timeout_ms_for(deadline, 10000))
+            except PWTimeout:
+                logging.info("Primary selectors not found quickly; continuing anyway.")
+
+        if await page.locator(CAPTCHA_SELECTOR).count():
+            logging.warning("Amazon bot check for url %s (marketplace %s)", url, marketplace)
+            blocked = True
+            return {"error": "Blocked by Amazon bot check (captcha)", "captcha": True}
+
+        await _adismiss_consent(page, deadline)
+
+        with log_stage("amazon_extract", scraper="playwright"):
+            raw = await _aextract_fields(page, marketplace, deadline)
+        return _build_result(url, orgUrl, raw, marketplace)
+
+    except (PWTimeout, DeadlineExceeded) as exc:
+        logging.warning("Playwright timeout for url %s: %s", url, exc)
+        return {"error": str(exc)}
+    except Exception as exc:
+        logging.exception("Playwright scraping error for url %s: %s", url, exc)
+        discard = True
+        return {"error": str(exc)}
+    finally:
+        if page is None:
+            discard = True  # new_page() failed: the context is broken
+        else:
+            try:
+                await page.close()
+            except Exception:
+                pass
+        await BrowserManager.arelease_context(marketplace, context, discard=discard, blocked=blocked)
@@ -0,0 +1,222 @@
+# services/product_pipeline.py
+"""
+Staged send-product pipeline used by /telegram/send-amazon-product.
+
+    fetch -> parse -> critical fields (title, price, discount, image)
+                          |-> LLM summary -> Telegram post      (caller)
+                          |-> product photo ------^             (worker)
+                          |-> secondary fields                  (worker)
+                       join -> full product record
+
+The caption prompt only needs the critical fields, so the OpenRouter call
+(and the Telegram post right after it) overlaps with extracting the slow
+secondary fields instead of waiting for them. The photo is downloaded and
+resized during the OpenRouter call too, so a cold image cache adds nothing
+to the post unless the download outlasts the summary.
+
+With a request deadline, the LLM call stops up to TELEGRAM_RESERVE seconds early
+so the post can still go out (without a summary), and the secondary fields
+are skipped once time is up; either way the result is flagged "partial".
+Once the post has gone out, a failed or late secondary extraction only
+makes the result partial, so a client retry never posts the product twice.
+"""
+import asyncio
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from config import PIPELINE_WORKERS, SEND_PRODUCT_PHOTO
+from services.amazon_service import (
+    assemble_product,
+    extract_critical_fields,
+    extract_secondary_fields,
+    fetch_amazon_page,
+    fetch_amazon_page_async,
+    parse_html,
+)
+from services.marketplaces import detect_marketplace
+from services.chat_service import handle_chat_request, handle_chat_request_async
+from services.image_service import telegram_photo, telegram_photo_async
+from services.send_amazon_product_to_telegram_service import (
+    send_amazon_product_to_telegram,
+    send_amazon_product_to_telegram_async,
+)
+from utils.deadline import out_of_time
+from utils.logger import log_stage
+
+TELEGRAM_RESERVE = 3  # seconds of the deadline kept for the Telegram post
+
+# Only the secondary-field extraction and the photo download run here; the
+# LLM -> Telegram branch stays on the request's own thread, so its
+# concurrency follows the server's threads.
+_executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="product-pipeline")
+
+
+def build_product_prompt(product_data: dict) -> str:
+    return (
+        f"Product Details:\n"
+        f"Title: {product_data.get('title', 'N/A')}\n"
+        f"Price: {product_data.get('price', 'N/A')}\n"
+        f"discount: {product_data.get('discount', 'N/A')}\n"
+        "Provide a short ,concise and engaging meassage for Telegram"
+    )
+
+
+def _parse_critical(html: str, full_url: str, org_url: str):
+    soup = parse_html(html)
+    return soup, assemble_product(full_url, org_url, extract_critical_fields(soup, detect_marketplace(full_url)))
+
+
+def _summary_deadline(deadline):
+    # Short budgets keep a quarter for the post rather than starving the LLM call
+    return deadline.reserve(min(TELEGRAM_RESERVE, deadline.remaining() / 4)) if deadline else None
+
+
+def _cut_by_deadline(status: int, summary_deadline) -> bool:
+    # Only a timeout caused by the request deadline makes the result partial;
+    # a 504 OpenRouter itself returned (or the 15s cap without a deadline) is a plain failure
+    return status == 504 and out_of_time(summary_deadline)
+
+
+def _prefetch_photo(critical_product: dict, deadline=None) -> bool:
+    return SEND_PRODUCT_PHOTO and critical_product.get("image", "Not Found") != "Not Found" and not out_of_time(deadline)
+
+
+def _join_photo(future, deadline=None):
+    """The prefetched photo, or None (text post) when it is not ready by the deadline."""
+    try:
+        return future.result(timeout=deadline.remaining() if deadline else None)
+    except FutureTimeout:
+        future.cancel()
+        logging.warning("Product photo not ready before the deadline; posting without it")
+    except Exception as e:
+        logging.error("Product photo preparation failed: %s", e)
+    return None
+
+
+async def _ajoin_photo(task):
+    try:
+        return await task
+    except Exception as e:
+        logging.error("Product photo preparation failed: %s", e)
+        return None
+
+
+def _summarize_and_post(critical_product: dict, deadline=None, photo=None):
+    summary_deadline = _summary_deadline(deadline)
+    ai_reply, status = handle_chat_request(build_product_prompt(critical_product), summary_deadline)
+    if status != 200:
+        logging.warning("AI chat service failed: %s", ai_reply)
+        ai_reply = None  # fallback in case AI fails
+
+    # Post as soon as the summary exists; the caption only needs the summary + link
+    if photo is not None:
+        photo = _join_photo(photo, deadline)
+    telegram_response = send_amazon_product_to_telegram(critical_product, ai_reply, deadline, photo)
+    return ai_reply, _cut_by_deadline(status, summary_deadline), telegram_response
+
+
+async def _summarize_and_post_async(critical_product: dict, deadline=None, photo=None):
+    summary_deadline = _summary_deadline(deadline)
+    ai_reply, status = await handle_chat_request_async(build_product_prompt(critical_product), summary_deadline)
+    if status != 200:
+        logging.warning("AI chat service failed: %s", ai_reply)
+        ai_reply = None
+
+    if photo is not None:
+        photo = await _ajoin_photo(photo)
+    telegram_response = await send_amazon_product_to_telegram_async(critical_product, ai_reply, deadline, photo)
+    return ai_reply, _cut_by_deadline(status, summary_deadline), telegram_response
+
+
+def _result(full_url: str, org_url: str, critical: dict, secondary, ai_reply, summary_timed_out: bool, telegram_response) -> dict:
+    parts = [critical] if secondary is None else [critical, secondary]
+    result = {
+        "product": assemble_product(full_url, org_url, *parts),
+        "ai_summary": ai_reply,
+        "telegram_response": telegram_response,
+    }
+    if secondary is None or summary_timed_out:
+        result["partial"] = True
+    return result
+
+
+def _extract_secondary(soup, marketplace: str) -> dict:
+    with log_stage("amazon_extract_secondary", scraper="static"):
+        return extract_secondary_fields(soup, marketplace)
+
+
+def _join_secondary(future, deadline=None):
+    """
+    The secondary fields, or None (partial result) when they were skipped,
+    failed, or are not ready by the deadline; time spent queued counts too.
+    """
+    if future is None:
+        return None
+    try:
+        return future.result(timeout=deadline.remaining() if deadline else None)
+    except FutureTimeout:
+        future.cancel()
+        logging.warning("Secondary fields not ready before the deadline; returning a partial product")
+    except Exception as e:
+        logging.error("Secondary field extraction failed: %s", e)
+    return None
+
+
+def run_send_product_pipeline(full_url: str, org_url: str, deadline=None) -> dict:
+    """
+    Scrape, summarize and post one product.
+    Returns {"product": ..., "ai_summary": ..., "telegram_response": ...}
+    (plus "partial": True when the deadline cut a stage short)
+    or {"error": ...} when the page could not be fetched/parsed.
+    """
+    try:
+        soup, critical = _parse_critical(fetch_amazon_page(full_url, deadline), full_url, org_url)
+    except Exception as e:
+        logging.error("Product page fetch/parse failed for %s: %s", full_url, e)
+        return {"error": str(e)}
+
+    secondary = photo = None
+    if not out_of_time(deadline):
+        # copy_context keeps the request id on the worker's log lines
+        secondary = _executor.submit(contextvars.copy_context().run, _extract_secondary, soup, critical["marketplace"])
+    if _prefetch_photo(critical, deadline):
+        photo = _executor.submit(contextvars.copy_context().run, telegram_photo, critical["image"], deadline)
+
+    summary = _summarize_and_post(critical, deadline, photo)
+    return _result(full_url, org_url, critical, _join_secondary(secondary, deadline), *summary)
+
+
+async def run_send_product_pipeline_async(full_url: str, org_url: str, deadline=None) -> dict:
+    """
+    Async variant of run_send_product_pipeline (ASGI mode); same return contract.
+    """
+    try:
+        html = await fetch_amazon_page_async(full_url, deadline)
+        soup, critical = await asyncio.to_thread(_parse_critical, html, full_url, org_url)
+    except Exception as e:
+        logging.error("Product page fetch/parse failed for %s: %s", full_url, e)
+        return {"error": str(e)}
+
+    photo = None
+    if _prefetch_photo(critical, deadline):
+        photo = asyncio.create_task(telegram_photo_async(critical["image"], deadline))
+    branch = asyncio.create_task(_summarize_and_post_async(critical, deadline, photo))
+    try:
+        secondary = None
+        if not out_of_time(deadline):
+            try:
+                secondary = await asyncio.wait_for(
+                    asyncio.to_thread(_extract_secondary, soup, critical["marketplace"]),
+                    timeout=deadline.remaining() if deadline else None)
+            except asyncio.TimeoutError:
+                logging.warning("Secondary fields not ready before the deadline; returning a partial product")
+            except Exception as e:
+                logging.error("Secondary field extraction failed: %s", e)
+        summary = await branch
+    finally:
+        for task in (branch, photo):
+            if task is not None and not task.done():
+                task.cancel()
+
+    return _result(full_url, org_url, critical, secondary, *summary)
@@ -0,0 +1,180 @@
+# services/selector_stats.py
+import atexit
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+from config import SELECTOR_STATS_PATH
+
+# Smoothing for the per-field hit-rate averages
+FAST_ALPHA = 0.2    # reacts within a handful of scrapes
+SLOW_ALPHA = 0.01   # long-run baseline
+COLLAPSE_RATIO = 0.5  # fast < 50% of baseline => collapsed
+MIN_SAMPLES = 20
+DECAY = 0.95        # per-attempt decay of a selector's recent counts (~20 attempts of memory)
+FLUSH_INTERVAL = 30  # seconds between background saves while there are new records
+
+
+class SelectorStats:
+    """
+    Hit statistics per field and per selector for the scrapers' fallback chains.
+
+    order() puts the selector most likely to hit first (Laplace-smoothed hit
+    rate over exponentially decayed counts, ties keep the configured order),
+    so after a layout change the old winner drops behind the selector that
+    now works within a few misses instead of hundreds. Only the Playwright
+    scraper reorders (a miss there costs a locator wait), and only chains of
+    interchangeable selectors; precedence chains and the static scraper are
+    recorded for the collapse check alone.
+    A field is flagged as collapsed when its recent hit rate drops below half
+    of its long-run rate - usually a sign Amazon changed the markup.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._selectors: Dict[str, Dict[str, Dict[str, int]]] = {}
+        self._fields: Dict[str, Dict[str, float]] = {}
+        self._collapsed = set()
+        self._dirty = 0
+        self._flusher = None
+        self._stopped = threading.Event()
+        if path:
+            self.load()
+
+    # ---------------- Ordering ---------------- #
+    def order(self, field: str, selectors: List[str]) -> List[str]:
+        with self._lock:
+            stats = self._selectors.get(field)
+            if not stats:
+                return list(selectors)
+            return sorted(selectors, key=lambda sel: -self._score(stats.get(sel)))
+
+    @staticmethod
+    def _recent(entry: Dict[str, float]):
+        """(recent_hits, recent_attempts); stats persisted before decay are scaled down to one window."""
+        if "recent_attempts" in entry:
+            return entry["recent_hits"], entry["recent_attempts"]
+        scale = min(1.0, 1 / (1 - DECAY) / entry["attempts"]) if entry["attempts"] else 0.0
+        return entry["hits"] * scale, entry["attempts"] * scale
+
+    @classmethod
+    def _score(cls, entry: Optional[Dict[str, float]]) -> float:
+        if not entry:
+            return 0.5
+        hits, attempts = cls._recent(entry)
+        return (hits + 1) / (attempts + 2)
+
+    # ---------------- Recording ---------------- #
+    def record_chain(self, field: str, tried: List[str], hit: Optional[str]):
+        """
+        Record one walk down a fallback chain: every selector in `tried` missed
+        except `hit` (the last one tried), or all missed when hit is None.
+        """
+        with self._lock:
+            stats = self._selectors.setdefault(field, {})
+            for sel in tried:
+                entry = stats.setdefault(sel, {"attempts": 0, "hits": 0})
+                recent_hits, recent_attempts = self._recent(entry)
+                entry["attempts"] += 1
+                entry["recent_attempts"] = recent_attempts * DECAY + 1
+                entry["recent_hits"] = recent_hits * DECAY + (sel == hit)
+                if sel == hit:
+                    entry["hits"] += 1
+            self._record_field(field, hit is not None)
+            self._dirty += 1
+            start_flusher = self.path and self._flusher is None
+            if start_flusher:
+                self._flusher = threading.Thread(target=self._flush_loop, name="selector-stats-flush", daemon=True)
+        if start_flusher:
+            self._flusher.start()
+
+    def _record_field(self, field: str, hit: bool):
+        value = 1.0 if hit else 0.0
+        f = self._fields.get(field)
+        if f is None:
+            f = self._fields[field] = {"samples": 0, "fast": value, "slow": value}
+        f["samples"] += 1
+        f["fast"] += FAST_ALPHA * (value - f["fast"])
+        f["slow"] += SLOW_ALPHA * (value - f["slow"])
+
+        collapsed = f["samples"] >= MIN_SAMPLES and f["fast"] < f["slow"] * COLLAPSE_RATIO
+        if collapsed and field not in self._collapsed:
+            self._collapsed.add(field)
+            logging.warning("Selector hit rate collapsed for field %s: recent %.2f vs baseline %.2f",
+                            field, f["fast"], f["slow"])
+        elif not collapsed and field in self._collapsed:
+            self._collapsed.discard(field)
+            logging.info("Selector hit rate recovered for field %s", field)
+
+    def collapsed_fields(self) -> List[str]:
+        with self._lock:
+            return sorted(self._collapsed)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "fields": {
+                    field: {
+                        **{k: round(v, 4) if isinstance(v, float) else v for k, v in self._fields.get(field, {}).items()},
+                        "collapsed": field in self._collapsed,
+                        "selectors": {
+                            sel: {**{k: round(v, 4) if isinstance(v, float) else v for k, v in entry.items()},
+                                  "hit_rate": round(entry["hits"] / entry["attempts"], 4) if entry["attempts"] else None}
+                            for sel, entry in sorted(stats.items(), key=lambda kv: -self._score(kv[1]))
+                        },
+                    }
+                    for field, stats in sorted(self._selectors.items())
+                },
+                "collapsed": sorted(self._collapsed),
+            }
+
+    # ---------------- Persistence ---------------- #
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            with self._lock:
+                self._selectors = data.get("selectors", {})
+                self._fields = data.get("fields", {})
+                self._collapsed = set(data.get("collapsed", []))
+        except (OSError, ValueError) as e:
+            logging.warning("Could not load selector stats from %s: %s", self.path, e)
+
+    def _flush_loop(self):
+        """Persist from a background thread so request threads (and the event loop) never write the file."""
+        while not self._stopped.wait(FLUSH_INTERVAL):
+            with self._lock:
+                dirty = self._dirty
+            if dirty:
+                self.save()
+
+    def close(self):
+        """Stop the flusher and write pending records (registered at exit)."""
+        self._stopped.set()
+        self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {"selectors": self._selectors, "fields": self._fields, "collapsed": sorted(self._collapsed)}
+            payload = json.dumps(data, indent=1, sort_keys=True)
+            self._dirty = 0
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                fh.write(payload)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logging.warning("Could not persist selector stats to %s: %s", self.path, e)
+
+
+# Shared by both scrapers; fields are namespaced "<scraper>:<field>"
+selector_stats = SelectorStats(SELECTOR_STATS_PATH)
+atexit.register(selector_stats.close)
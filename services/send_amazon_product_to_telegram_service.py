@@ -1,43 +1,342 @@
+import asyncio
+import html
+import json
 import logging
+import time
 import requests
-from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+from utils.deadline import arequest_within, request_within
+from utils.logger import log_stage
+from services.async_http import get_async_client
+from services.image_service import forget_upload, remember_upload, telegram_photo, telegram_photo_async
+from config import SEND_PRODUCT_PHOTO, TELEGRAM_API_URL, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
 
-def send_amazon_product_to_telegram(product_data: dict, ai_summary: str = None):
+CAPTION_LIMIT = 1024  # Telegram's limit for photo captions; longer posts go out as text
+MESSAGE_LIMIT = 4096  # Telegram's limit for text messages
+MEDIA_GROUP_SIZE = (2, 10)  # sendMediaGroup takes 2-10 items
+RETRY_AFTER_LIMIT = 10  # seconds; a longer 429 retry_after fails the post instead of waiting
+_UNFETCHED = object()  # `photo` default: fetch the image while sending
+
+def _caption(product_data: dict, ai_summary: str = None) -> str:
+    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
+        raise Exception("Missing TELEGRAM_BOT_TOKEN or TELEGRAM_CHAT_ID in environment variables")
+
+    orgUrl = product_data.get("orgUrl", product_data.get("url", ""))
+
+    # Prepare caption: AI summary first, then link
+    caption_lines = []
+    if ai_summary:
+        caption_lines.append(f"{ai_summary}")  # AI summary first
+    caption_lines.append(f"<b>{orgUrl}</b>")  # Link second (bold)
+    return "\n\n".join(caption_lines)
+
+def _build_message(product_data: dict, ai_summary: str = None):
+    url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    data = {
+        "chat_id": TELEGRAM_CHAT_ID,
+        "text": _caption(product_data, ai_summary),
+        "parse_mode": "HTML",
+        "disable_web_page_preview": False
+    }
+    return url, data
+
+def _build_photo(photo: dict, caption: str):
     """
-    Send Amazon product data to a Telegram chat.
-    Includes AI summary first and orgUrl second.
+    sendPhoto request: by file_id when Telegram already has the image,
+    otherwise as a multipart upload of the resized JPEG.
+    """
+    url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/sendPhoto"
+    data = {
+        "chat_id": TELEGRAM_CHAT_ID,
+        "caption": caption,
+        "parse_mode": "HTML",
+    }
+    files = None
+    if photo.get("file_id"):
+        data["photo"] = photo["file_id"]
+    else:
+        files = {"photo": ("product.jpg", photo["data"], "image/jpeg")}
+    return url, data, files
+
+def _wants_photo(product_data: dict, caption: str) -> bool:
+    return SEND_PRODUCT_PHOTO and bool(product_data.get("image")) and len(caption) <= CAPTION_LIMIT
+
+def _retry_after(response, deadline=None):
+    """
+    Seconds to wait before retrying a 429 (requests or httpx), or None when it
+    is not a 429 or the wait does not fit RETRY_AFTER_LIMIT and the deadline.
     """
+    if response.status_code != 429:
+        return None
     try:
-        if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
-            raise Exception("Missing TELEGRAM_BOT_TOKEN or TELEGRAM_CHAT_ID in environment variables")
+        wait = float(response.json()["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        return None
+    limit = min(RETRY_AFTER_LIMIT, deadline.remaining()) if deadline else RETRY_AFTER_LIMIT
+    return wait if wait < limit else None
+
+def _post(url: str, deadline=None, cap: float = 20, **kwargs):
+    """POST to the Bot API; a 429 is retried once after its retry_after when that fits."""
+    response = request_within("POST", url, deadline, cap, **kwargs)
+    wait = _retry_after(response, deadline)
+    if wait is not None:
+        logging.warning("Telegram rate limit hit; retrying in %ss", wait)
+        time.sleep(wait)
+        response = request_within("POST", url, deadline, cap, **kwargs)
+    return response
+
+async def _apost(url: str, deadline=None, cap: float = 20, **kwargs):
+    response = await arequest_within(get_async_client(), "POST", url, deadline, cap, **kwargs)
+    wait = _retry_after(response, deadline)
+    if wait is not None:
+        logging.warning("Telegram rate limit hit; retrying in %ss", wait)
+        await asyncio.sleep(wait)
+        response = await arequest_within(get_async_client(), "POST", url, deadline, cap, **kwargs)
+    return response
+
+def _rejected(response) -> bool:
+    """
+    A 4xx answer (requests or httpx): Telegram refused the photo and posted
+    nothing. Not a 429: a text message would be rate-limited too, so that
+    one raises instead of posting the product without its photo.
+    """
+    if not 400 <= response.status_code < 500 or response.status_code == 429:
+        return False
+    logging.warning("sendPhoto rejected (%s), falling back to sendMessage: %s",
+                    response.status_code, response.text[:200])
+    return True
+
+def _send_photo(product_data: dict, caption: str, deadline=None, photo=_UNFETCHED):
+    """
+    Post the product photo with the caption; None if there is no usable image
+    or Telegram rejected the photo (4xx), so the caller can fall back to a text
+    message. Timeouts and 5xx raise instead: Telegram may already have posted,
+    and a fallback would post the product twice.
+    """
+    if photo is _UNFETCHED:
+        photo = telegram_photo(product_data.get("image"), deadline)
+    if not photo:
+        return None
+    url, data, files = _build_photo(photo, caption)
+    with log_stage("telegram_send", method="sendPhoto", cached_file_id=bool(photo.get("file_id"))) as stage:
+        response = _post(url, deadline, 20, data=data, files=files)
+        stage["status_code"] = response.status_code
+    if _rejected(response):
+        if response.status_code == 400:  # e.g. a stale file_id; 429 says nothing about the photo
+            forget_upload(photo)
+        return None
+    response.raise_for_status()
+    result = response.json()
+    remember_upload(photo, result)
+    return result
 
-        orgUrl = product_data.get("orgUrl", product_data.get("url", ""))
+async def _send_photo_async(product_data: dict, caption: str, deadline=None, photo=_UNFETCHED):
+    if photo is _UNFETCHED:
+        photo = await telegram_photo_async(product_data.get("image"), deadline)
+    if not photo:
+        return None
+    url, data, files = _build_photo(photo, caption)
+    with log_stage("telegram_send", method="sendPhoto", cached_file_id=bool(photo.get("file_id"))) as stage:
+        response = await _apost(url, deadline, 20, data=data, files=files)
+        stage["status_code"] = response.status_code
+    if _rejected(response):
+        if response.status_code == 400:
+            await asyncio.to_thread(forget_upload, photo)
+        return None
+    response.raise_for_status()
+    result = response.json()
+    await asyncio.to_thread(remember_upload, photo, result)
+    return result
 
-        # Prepare caption: AI summary first, then link
-        caption_lines = []
-        if ai_summary:
-            caption_lines.append(f"{ai_summary}")  # AI summary first
-        caption_lines.append(f"<b>{orgUrl}</b>")  # Link second (bold)
-        caption = "\n\n".join(caption_lines)
+def send_amazon_product_to_telegram(product_data: dict, ai_summary: str = None, deadline=None, photo=_UNFETCHED):
+    """
+    Send Amazon product data to a Telegram chat.
+    Includes AI summary first and orgUrl second; posted as a photo caption
+    when the product has an image, as a text message otherwise.
+    `photo` is a telegram_photo() result fetched ahead of time (the pipeline
+    fetches it while the summary is written); by default it is fetched here.
+    """
+    try:
+        caption = _caption(product_data, ai_summary)
+        if _wants_photo(product_data, caption):
+            result = _send_photo(product_data, caption, deadline, photo)
+            if result is not None:
+                logging.info("✅ Amazon product photo successfully sent to Telegram.")
+                return {"success": True, "telegram_response": result}
 
-        telegram_api = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
+        url, data = _build_message(product_data, ai_summary)
 
         # Send message to Telegram
-        response = requests.post(
-            f"{telegram_api}/sendMessage",
-            data={
-                "chat_id": TELEGRAM_CHAT_ID,
-                "text": caption,
-                "parse_mode": "HTML",
-                "disable_web_page_preview": False
-            },
-            timeout=20
-        )
+        with log_stage("telegram_send", method="sendMessage") as stage:
+            response = _post(url, deadline, 20, data=data)
+            stage["status_code"] = response.status_code
+
+        response.raise_for_status()
+        logging.info("✅ Amazon product successfully sent to Telegram.")
+        return {"success": True, "telegram_response": response.json()}
+
+    except Exception as e:
+        logging.error("❌ Error sending product to Telegram: %s", e)
+        return {"success": False, "error": str(e)}
+
+async def send_amazon_product_to_telegram_async(product_data: dict, ai_summary: str = None, deadline=None, photo=_UNFETCHED):
+    """
+    Async variant of send_amazon_product_to_telegram for the ASGI app.
+    """
+    try:
+        caption = _caption(product_data, ai_summary)
+        if _wants_photo(product_data, caption):
+            result = await _send_photo_async(product_data, caption, deadline, photo)
+            if result is not None:
+                logging.info("✅ Amazon product photo successfully sent to Telegram.")
+                return {"success": True, "telegram_response": result}
+
+        url, data = _build_message(product_data, ai_summary)
+
+        with log_stage("telegram_send", method="sendMessage") as stage:
+            response = await _apost(url, deadline, 20, data=data)
+            stage["status_code"] = response.status_code
 
         response.raise_for_status()
         logging.info("✅ Amazon product successfully sent to Telegram.")
         return {"success": True, "telegram_response": response.json()}
 
     except Exception as e:
-        logging.error(f"❌ Error sending product to Telegram: {e}")
+        logging.error("❌ Error sending product to Telegram: %s", e)
         return {"success": False, "error": str(e)}
+
+def _build_media_group(photos: list, captions: list):
+    """
+    sendMediaGroup request: cached photos by file_id, the others attached
+    to the same multipart upload as attach://photoN.
+    """
+    url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/sendMediaGroup"
+    media, files = [], {}
+    for i, (photo, caption) in enumerate(zip(photos, captions)):
+        item = {"type": "photo", "caption": caption, "parse_mode": "HTML"}
+        if photo.get("file_id"):
+            item["media"] = photo["file_id"]
+        else:
+            item["media"] = f"attach://photo{i}"
+            files[f"photo{i}"] = (f"photo{i}.jpg", photo["data"], "image/jpeg")
+        media.append(item)
+    return url, {"chat_id": TELEGRAM_CHAT_ID, "media": json.dumps(media)}, files or None
+
+def _with_intro(intro: str, caption: str, limit: int) -> str:
+    """Prefix `caption` with the intro, shortened at a word boundary to stay within `limit`."""
+    head = html.escape(intro or "")
+    room = limit - len(caption) - 2
+    if len(head) > room:
+        head = head[:max(room - 1, 0)].rsplit(" ", 1)[0] + "…" if room > 1 else ""
+    return f"{head}\n\n{caption}" if head else caption
+
+def _digest_text(intro: str, entries: list):
+    """
+    One HTML message: the intro, then as many entries as fit in MESSAGE_LIMIT.
+    Returns (text, entries that made it in).
+    """
+    text = html.escape(intro or "")
+    included = []
+    for entry in entries:
+        chunk = f"\n\n{entry['caption']}" if text else entry["caption"]
+        if len(text) + len(chunk) > MESSAGE_LIMIT:
+            break
+        text += chunk
+        included.append(entry)
+    return text, included
+
+def _send_digest_album(intro: str, entries: list, deadline=None):
+    """
+    Post the first entries whose photo is usable (up to 10) as one album, the
+    intro on the first photo that made it in. Returns (telegram json, entries
+    posted), or (None, []) with fewer than two photos or when Telegram rejected
+    the album (4xx). After a timeout or 5xx the album may already be posted,
+    so its entries come back as posted with a None result (never resent);
+    a 429 that does not fit the deadline raises.
+    """
+    pairs = []
+    for entry in entries:
+        if len(pairs) == MEDIA_GROUP_SIZE[1]:
+            break
+        photo = telegram_photo(entry.get("image"), deadline)
+        if photo:
+            pairs.append((photo, entry))
+    if len(pairs) < MEDIA_GROUP_SIZE[0]:
+        return None, []
+    photos = [photo for photo, _ in pairs]
+    captions = [entry["caption"] for _, entry in pairs]
+    captions[0] = _with_intro(intro, captions[0], CAPTION_LIMIT)
+    url, data, files = _build_media_group(photos, captions)
+    try:
+        with log_stage("telegram_send", method="sendMediaGroup", items=len(photos)) as stage:
+            response = _post(url, deadline, 60, data=data, files=files)
+            stage["status_code"] = response.status_code
+    except requests.RequestException as e:
+        logging.warning("⚠️ Deal digest album outcome unknown, not resending it: %s", e)
+        return None, [entry for _, entry in pairs]
+    if _rejected(response):
+        if response.status_code == 400:
+            for photo in photos:
+                forget_upload(photo)
+        return None, []
+    if response.status_code >= 500:
+        logging.warning("⚠️ Deal digest album outcome unknown (%s), not resending it", response.status_code)
+        return None, [entry for _, entry in pairs]
+    response.raise_for_status()  # a 429 that could not wait: nothing was posted
+    result = response.json()
+    for photo, message in zip(photos, result.get("result", [])):
+        remember_upload(photo, {"result": message})
+    return result, [entry for _, entry in pairs]
+
+def send_digest_to_telegram(intro: str, entries: list, media_group: bool = False, deadline=None):
+    """
+    Post a deal digest. `entries` are {"rank", "caption" (HTML), "image"} in
+    rank order. With media_group, entries with a usable photo go out as one
+    album and the rest follow in one text message; otherwise everything is
+    one text message. "posted_ranks" lists the entries that were posted (or
+    may have been, after a timeout or 5xx), also on failure, so the caller
+    can keep the others for the next digest.
+    """
+    posted, responses = [], []
+    try:
+        if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
+            raise Exception("Missing TELEGRAM_BOT_TOKEN or TELEGRAM_CHAT_ID in environment variables")
+
+        if media_group:
+            result, in_album = _send_digest_album(intro, entries, deadline)
+            if in_album:
+                posted += in_album
+                intro = None  # already on the album
+            if result is not None:
+                responses.append(result)
+                logging.info("✅ Deal digest album of %s photo(s) sent to Telegram.", len(in_album))
+
+        rest = [entry for entry in entries if entry not in posted]
+        if rest:
+            text, included = _digest_text(intro, rest)
+            url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+            data = {
+                "chat_id": TELEGRAM_CHAT_ID,
+                "text": text,
+                "parse_mode": "HTML",
+                "disable_web_page_preview": True
+            }
+            with log_stage("telegram_send", method="sendMessage", items=len(included)) as stage:
+                try:
+                    response = _post(url, deadline, 20, data=data)
+                except requests.Timeout:
+                    posted += included  # may have gone out; don't queue it for a second post
+                    raise
+                stage["status_code"] = response.status_code
+
+            if response.status_code >= 500:
+                posted += included
+            response.raise_for_status()
+            responses.append(response.json())
+            posted += included
+            logging.info("✅ Deal digest message with %s product(s) sent to Telegram.", len(included))
+
+        return {"success": True, "telegram_responses": responses, "posted_ranks": sorted(entry["rank"] for entry in posted)}
+
+    except Exception as e:
+        logging.error("❌ Error sending deal digest to Telegram: %s", e)
+        return {"success": False, "error": str(e), "posted_ranks": sorted(entry["rank"] for entry in posted)}
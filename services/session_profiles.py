@@ -0,0 +1,76 @@
+# services/session_profiles.py
+import itertools
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Dict, Optional
+
+from config import SESSION_PROFILE_DIR, SESSION_PROFILES_PER_MARKETPLACE
+
+# Markers of Amazon's bot-check interstitial
+CAPTCHA_SELECTOR = "form[action*='validateCaptcha'], #captchacharacters"
+CAPTCHA_MARKERS = ("/errors/validateCaptcha", "id=\"captchacharacters\"")
+
+
+def is_captcha_html(html: str) -> bool:
+    return any(marker in html for marker in CAPTCHA_MARKERS)
+
+
+class SessionProfiles:
+    """
+    Playwright storage-state files (cookies + localStorage) on disk:
+
+        <root>/<marketplace>/profile-<slot>.json
+
+    New contexts start from a saved profile so they arrive with the consent
+    cookie and an established session instead of a fresh, captcha-prone one.
+    A profile that hits a captcha is rotated: its file is deleted and the
+    slot starts clean on its next use.
+    """
+
+    def __init__(self, root: str, slots: int):
+        self.root = root
+        self.slots = max(1, slots)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, itertools.count] = {}
+
+    def path(self, marketplace: str, slot: int) -> str:
+        return os.path.join(self.root, marketplace.replace(".", "_"), f"profile-{slot}.json")
+
+    def next_slot(self, marketplace: str) -> int:
+        with self._lock:
+            counter = self._counters.setdefault(marketplace, itertools.count())
+            return next(counter) % self.slots
+
+    def storage_state(self, marketplace: str, slot: int) -> Optional[str]:
+        """Path to pass as new_context(storage_state=...), or None when the slot is empty."""
+        path = self.path(marketplace, slot)
+        return path if os.path.exists(path) else None
+
+    def save(self, marketplace: str, slot: int, state: dict):
+        """
+        Write a context's storage_state() for the slot. Contexts sharing a slot
+        can save at the same time, so each writes its own temp file and swaps
+        it in: a new context never loads a half-written profile.
+        """
+        path = self.path(marketplace, slot)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(state, fh)
+        os.replace(tmp, path)
+
+    def rotate(self, marketplace: str, slot: int):
+        path = self.path(marketplace, slot)
+        try:
+            os.remove(path)
+            logging.warning("Bot check hit; rotated session profile %s", path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.warning("Could not rotate session profile %s: %s", path, e)
+
+
+session_profiles = SessionProfiles(SESSION_PROFILE_DIR, SESSION_PROFILES_PER_MARKETPLACE)
@@ -1,8 +1,17 @@
-import requests
 import logging
-from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+from utils.deadline import arequest_within, request_within
+from utils.logger import log_stage
+from services.async_http import get_async_client
+from config import TELEGRAM_API_URL, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
 
-def send_telegram_message(message: str):
+def _parse_response(response):
+    if response.status_code == 200:
+        return {"status": "success", "message": "Message sent to Telegram"}, 200
+    else:
+        logging.error("Telegram API error: %s", response.text)
+        return {"error": response.text}, response.status_code
+
+def send_telegram_message(message: str, deadline=None):
     """
     Sends a message to Telegram using the bot token and chat ID.
     """
@@ -10,19 +19,40 @@ def send_telegram_message(message: str):
         logging.error("Telegram bot token or chat ID is missing.")
         return {"error": "Telegram configuration missing"}, 500
 
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    payload = {
+        "chat_id": TELEGRAM_CHAT_ID,
+        "text": message
+    }
+
+    try:
+        with log_stage("telegram_send", method="sendMessage") as stage:
+            response = request_within("POST", url, deadline, 10, data=payload)
+            stage["status_code"] = response.status_code
+        return _parse_response(response)
+    except Exception as e:
+        logging.error("Telegram request error: %s", e)
+        return {"error": str(e)}, 500
+
+async def send_telegram_message_async(message: str, deadline=None):
+    """
+    Async variant of send_telegram_message for the ASGI app.
+    """
+    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
+        logging.error("Telegram bot token or chat ID is missing.")
+        return {"error": "Telegram configuration missing"}, 500
+
+    url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {
         "chat_id": TELEGRAM_CHAT_ID,
         "text": message
     }
 
     try:
-        response = requests.post(url, data=payload, timeout=10)
-        if response.status_code == 200:
-            return {"status": "success", "message": "Message sent to Telegram"}, 200
-        else:
-            logging.error(f"Telegram API error: {response.text}")
-            return {"error": response.text}, response.status_code
+        with log_stage("telegram_send", method="sendMessage") as stage:
+            response = await arequest_within(get_async_client(), "POST", url, deadline, 10, data=payload)
+            stage["status_code"] = response.status_code
+        return _parse_response(response)
     except Exception as e:
-        logging.error(f"Telegram request error: {e}")
+        logging.error("Telegram request error: %s", e)
         return {"error": str(e)}, 500
@@ -0,0 +1,30 @@
+import asyncio
+import time
+
+import httpx
+
+
+def test_fallback_serves_flask_routes_concurrently():
+    import app
+    import asgi
+
+    # Importing asgi builds only the fallback app and leaves the digest job to before_serving
+    assert app._app is None
+
+    flask_app = asgi._wsgi_fallback.app
+
+    @flask_app.route("/_probe/sleep")
+    def probe_sleep():
+        time.sleep(1)
+        return "ok"
+
+    async def run():
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(client.get("/_probe/sleep") for _ in range(4)))
+            return time.perf_counter() - start, responses
+
+    elapsed, responses = asyncio.run(run())
+    assert [r.status_code for r in responses] == [200] * 4
+    assert elapsed < 2.5
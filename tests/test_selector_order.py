@@ -0,0 +1,48 @@
+import random
+
+from services import playwright_amazon_service as pas
+from services.selector_stats import SelectorStats
+
+
+class FakeLocator:
+    def __init__(self, text):
+        self.first = self
+        self.text = text
+
+    def text_content(self, timeout=None):
+        if self.text is None:
+            raise TimeoutError("no match")
+        return self.text
+
+
+class FakePage:
+    """Just enough of a Playwright page for _page_text: selector -> text."""
+
+    def __init__(self, texts):
+        self.texts = texts
+
+    def locator(self, sel):
+        return FakeLocator(self.texts.get(sel))
+
+
+def test_generic_selector_does_not_overtake_specific_one(monkeypatch):
+    monkeypatch.setattr(pas, "selector_stats", SelectorStats())
+    selectors = pas.TEXT_SELECTORS["deal_price"]
+    rng = random.Random(0)
+    for _ in range(200):
+        texts = {".a-price .a-offscreen": "₹999"}
+        if rng.random() < 0.3:
+            texts["#priceblock_dealprice"] = "₹499"
+        pas._page_text(FakePage(texts), selectors, "in:deal_price")
+
+    deal_page = FakePage({".a-price .a-offscreen": "₹999", "#priceblock_dealprice": "₹499"})
+    assert pas._page_text(deal_page, selectors, "in:deal_price") == "₹499"
+
+
+def test_interchangeable_chain_is_reordered(monkeypatch):
+    monkeypatch.setattr(pas, "selector_stats", SelectorStats())
+    selectors = pas.TEXT_SELECTORS["title"]
+    for _ in range(10):
+        pas._page_text(FakePage({"h1.a-size-large": "Headphones"}), selectors, "in:title")
+
+    assert pas._ordered("in:title", selectors)[0] == "h1.a-size-large"
@@ -4,6 +4,7 @@ ROUTE_CHAT = "/chat"
 
 # API URLs
 OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+TELEGRAM_API_URL = "https://api.telegram.org"
 
 # Models
 OPENROUTER_MODEL_FREE = "openai/gpt-oss-20b:free"
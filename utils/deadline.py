@@ -0,0 +1,108 @@
+import asyncio
+import time
+from typing import Optional
+
+from config import REQUEST_DEADLINE_SECONDS
+
+DEADLINE_HEADER = "X-Request-Timeout"  # seconds; can only shorten the server default
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's end-to-end budget ran out before a stage could start."""
+
+
+class Deadline:
+    """
+    End-to-end time budget for one request. Each stage asks for
+    timeout(cap): its own limit, shortened to whatever budget is left.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: float) -> float:
+        """Seconds this stage may use; raises DeadlineExceeded when none are left."""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Request deadline of {self.seconds:g}s exceeded")
+        return min(cap, remaining)
+
+    def reserve(self, seconds: float) -> "Deadline":
+        """A deadline `seconds` earlier, keeping that much for the stages after this one."""
+        child = Deadline.__new__(Deadline)
+        child.seconds = max(0.0, self.seconds - seconds)
+        child.expires_at = self.expires_at - seconds
+        return child
+
+    def timeout_ms(self, cap_ms: float) -> float:
+        """Same as timeout() in milliseconds, for Playwright."""
+        return self.timeout(cap_ms / 1000) * 1000
+
+
+def timeout_for(deadline: Optional[Deadline], cap: float) -> float:
+    return deadline.timeout(cap) if deadline else cap
+
+
+def timeout_ms_for(deadline: Optional[Deadline], cap_ms: float) -> float:
+    return deadline.timeout_ms(cap_ms) if deadline else cap_ms
+
+
+# requests/httpx timeouts apply to each connect and read, not to the whole
+# call: a body that trickles in a few bytes at a time never trips them.
+# These run the call under one wall-clock budget - `cap` seconds, cut to the
+# deadline - and raise the client's ReadTimeout once it is spent.
+def request_within(method: str, url: str, deadline: Optional[Deadline] = None, cap: float = 15, **kwargs):
+    """requests.request() with the body streamed and the budget checked between reads."""
+    import requests
+
+    budget = timeout_for(deadline, cap)
+    stop = time.monotonic() + budget
+    response = requests.request(method, url, stream=True, timeout=budget, **kwargs)
+    try:
+        chunks = []
+        # read1 returns what has arrived instead of waiting for a full chunk
+        while chunk := response.raw.read1(64 * 1024, decode_content=True):
+            if time.monotonic() > stop:
+                raise requests.exceptions.ReadTimeout(f"{method} {url} took longer than {budget:.3g}s")
+            chunks.append(chunk)
+        response._content = b"".join(chunks)  # what Response.content would have cached
+    finally:
+        response.close()
+    return response
+
+
+async def arequest_within(client, method: str, url: str, deadline: Optional[Deadline] = None, cap: float = 15, **kwargs):
+    """client.request() (httpx) cancelled once the budget is spent."""
+    import httpx
+
+    budget = timeout_for(deadline, cap)
+    try:
+        return await asyncio.wait_for(client.request(method, url, timeout=budget, **kwargs), budget)
+    except asyncio.TimeoutError:
+        raise httpx.ReadTimeout(f"{method} {url} took longer than {budget:.3g}s") from None
+
+
+def out_of_time(deadline: Optional[Deadline]) -> bool:
+    return deadline is not None and deadline.expired()
+
+
+def request_deadline(headers) -> Deadline:
+    """
+    Deadline for an incoming request: REQUEST_DEADLINE_SECONDS, or less when
+    the caller sends X-Request-Timeout (works with Flask and Quart headers).
+    """
+    seconds = REQUEST_DEADLINE_SECONDS
+    try:
+        requested = float(headers.get(DEADLINE_HEADER, ""))
+        if requested > 0:
+            seconds = min(seconds, requested)
+    except ValueError:
+        pass
+    return Deadline(seconds)
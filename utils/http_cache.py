@@ -0,0 +1,204 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+COMPRESS_MIN_BYTES = 500
+COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/css", "application/javascript")
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # fast enough to run per response; 11 is for static assets
+MAX_CACHED_ENTRIES = 256
+
+_lock = threading.Lock()
+_first_seen = OrderedDict()    # etag -> Last-Modified for that content
+_compressed = OrderedDict()    # (etag, encoding) -> compressed body
+_templates = {}                # template name -> rendered body
+
+
+def _remember(cache: OrderedDict, key, value):
+    with _lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > MAX_CACHED_ENTRIES:
+            cache.popitem(last=False)
+
+
+def _recall(cache: OrderedDict, key):
+    with _lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def etag_for(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def last_modified_for(etag: str) -> datetime:
+    """When this exact content was first served (stable while it doesn't change)."""
+    seen = _recall(_first_seen, etag)
+    if seen is None:
+        seen = datetime.now(timezone.utc).replace(microsecond=0)
+        _remember(_first_seen, etag, seen)
+    return seen
+
+
+# ---------------- Projection ---------------- #
+def parse_fields(value: Optional[str]) -> Optional[list]:
+    """Split a fields= value: "title,price" -> ["title", "price"]; None when absent."""
+    if not value:
+        return None
+    fields = [f.strip() for f in value.split(",") if f.strip()]
+    return fields or None
+
+
+def project(product: dict, fields: Optional[list]) -> dict:
+    """Keep only `fields` (unknown names are ignored); "partial" always survives."""
+    if not fields:
+        return product
+    projected = {key: product[key] for key in fields if key in product}
+    if product.get("partial"):
+        projected["partial"] = True
+    return projected
+
+
+# ---------------- Conditional responses ---------------- #
+def _dump(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _prepare(response, body: bytes, cache_control: str = "no-cache"):
+    etag = etag_for(body)
+    response.set_etag(etag)
+    response.last_modified = last_modified_for(etag)
+    response.headers["Cache-Control"] = cache_control
+    # Set here, not only in _encode, so a 304 is keyed like the (compressed) 200
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def json_response(payload, status: int = 200):
+    """
+    Flask JSON response with a content-hash ETag and Last-Modified;
+    answers 304 when the client already has this exact body.
+    """
+    from flask import Response, request
+
+    body = _dump(payload)
+    response = Response(body, status=status, mimetype="application/json")
+    if status != 200:
+        return response
+    return _prepare(response, body).make_conditional(request)
+
+
+async def ajson_response(payload, status: int = 200):
+    """Quart counterpart of json_response."""
+    from quart import Response, request
+
+    body = _dump(payload)
+    response = Response(body, status=status, mimetype="application/json")
+    if status != 200:
+        return response
+    return await _prepare(response, body).make_conditional(request)
+
+
+def render_cached(template_name: str):
+    """
+    Render a context-free template once per process and serve it with
+    ETag/Last-Modified. Rendering is skipped on later hits; with template
+    auto-reload (debug) every hit renders so edits show up. Templates that
+    need per-request context must use render_template.
+    """
+    from flask import Response, current_app, render_template, request
+
+    body = None if current_app.jinja_env.auto_reload else _templates.get(template_name)
+    if body is None:
+        body = _templates[template_name] = render_template(template_name).encode("utf-8")
+    response = Response(body, mimetype="text/html")
+    return _prepare(response, body).make_conditional(request)
+
+
+# ---------------- Compression ---------------- #
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _compressible(response) -> bool:
+    return (
+        response.status_code == 200
+        and response.mimetype in COMPRESSIBLE_TYPES
+        and "Content-Encoding" not in response.headers
+        and not getattr(response, "direct_passthrough", False)
+        and not getattr(response, "is_streamed", False)
+    )
+
+
+def _encode(response, body: bytes, accept_encoding: str):
+    """Swap in a compressed body; responses with an ETag reuse earlier compressions."""
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return response
+    etag, _ = response.get_etag()
+    compressed = _recall(_compressed, (etag, encoding)) if etag else None
+    if compressed is None:
+        compressed = compress(body, encoding)
+        if etag:
+            _remember(_compressed, (etag, encoding), compressed)
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    if etag:
+        # Same content, different bytes: a weak ETag still matches If-None-Match
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """gzip/brotli for JSON, HTML and CSS responses of a Flask app."""
+    from flask import request
+
+    @app.after_request
+    def _compress(response):
+        if not _compressible(response):
+            return response
+        return _encode(response, response.get_data(), request.headers.get("Accept-Encoding", ""))
+
+
+def init_async_compression(app):
+    """Quart counterpart of init_compression."""
+    from quart import request
+
+    @app.after_request
+    async def _compress(response):
+        if not _compressible(response):
+            return response
+        return _encode(response, await response.get_data(), request.headers.get("Accept-Encoding", ""))
@@ -1,8 +1,215 @@
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
+import queue
+import random
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+
+from config import LOG_FORMAT, LOG_INFO_SAMPLE_RATE, LOG_LEVEL
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+_listener = None
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+def set_request_id(request_id: str = None):
+    """Bind a request id to the current context; returns a token for reset_request_id."""
+    return _request_id.set(request_id or uuid.uuid4().hex[:12])
+
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp the current request id on the record (runs in the caller's thread)."""
+
+    def filter(self, record):
+        record.request_id = get_request_id() or "-"
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only `rate` of INFO/DEBUG records. Warnings and errors always pass,
+    as do records logged with extra={"no_sample": True}. The decision is made
+    per request id so a sampled request keeps all of its lines.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if self.rate >= 1 or record.levelno >= logging.WARNING or getattr(record, "no_sample", False):
+            return True
+        request_id = getattr(record, "request_id", "-")
+        if request_id != "-":
+            return (zlib.crc32(request_id.encode()) % 10000) < self.rate * 10000
+        return random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra=` fields (stage, duration_ms, ...) are kept as keys."""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", "-")
+        if request_id != "-":
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and key != "no_sample":
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler.prepare() formats the whole record in the calling thread.
+    Only the %-interpolation is done here, so mutable arguments are captured
+    as they were at the call; the listener thread does the JSON serialization.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+@contextmanager
+def log_stage(stage: str, **fields):
+    """
+    Time a pipeline stage and log it as {"stage": ..., "duration_ms": ...}.
+    Usage:
+        with log_stage("openrouter", model=model):
+            ...
+    """
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield fields
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        duration_ms = round((time.perf_counter() - start) * 1000, 1)
+        logging.info("stage %s %s in %.1fms", stage, status, duration_ms,
+                     extra={"stage": stage, "status": status, "duration_ms": duration_ms, **fields})
+
+
+def init_request_logging(app):
+    """Attach request-id binding and per-request timing to a Flask app."""
+    from flask import g, request
+
+    @app.before_request
+    def _bind_request_id():
+        g._log_token = set_request_id(request.headers.get("X-Request-ID"))
+        g._log_start = time.perf_counter()
+
+    @app.after_request
+    def _log_request(response):
+        start = g.pop("_log_start", None)
+        if start is not None:
+            duration_ms = round((time.perf_counter() - start) * 1000, 1)
+            logging.info("%s %s -> %s in %.1fms", request.method, request.path, response.status_code, duration_ms,
+                         extra={"stage": "request", "status_code": response.status_code,
+                                "duration_ms": duration_ms, "no_sample": True})
+        response.headers["X-Request-ID"] = get_request_id() or ""
+        return response
+
+    @app.teardown_request
+    def _unbind_request_id(exc):
+        token = g.pop("_log_token", None)
+        if token is not None:
+            reset_request_id(token)
+
+
+def init_async_request_logging(app):
+    """
+    Quart counterpart of init_request_logging. The hooks must be coroutines:
+    Quart runs sync hooks in a thread with a copied context, so a request id
+    set there would never reach the handler.
+    """
+    from quart import g, request
+
+    @app.before_request
+    async def _bind_request_id():
+        g._log_token = set_request_id(request.headers.get("X-Request-ID"))
+        g._log_start = time.perf_counter()
+
+    @app.after_request
+    async def _log_request(response):
+        start = g.pop("_log_start", None)
+        if start is not None:
+            duration_ms = round((time.perf_counter() - start) * 1000, 1)
+            logging.info("%s %s -> %s in %.1fms", request.method, request.path, response.status_code, duration_ms,
+                         extra={"stage": "request", "status_code": response.status_code,
+                                "duration_ms": duration_ms, "no_sample": True})
+        response.headers["X-Request-ID"] = get_request_id() or ""
+        return response
+
+    @app.teardown_request
+    async def _unbind_request_id(exc):
+        token = g.pop("_log_token", None)
+        if token is not None:
+            try:
+                reset_request_id(token)
+            except ValueError:
+                pass  # teardown ran in a different context than before_request
+
 
 def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(message)s",
-        handlers=[logging.StreamHandler()]
-    )
+    """
+    Route all logging through a queue: request threads only enqueue records,
+    a QueueListener thread formats and writes them to stdout.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler()
+    if LOG_FORMAT == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] [%(request_id)s] %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+    queue_handler.addFilter(SamplingFilter(LOG_INFO_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None